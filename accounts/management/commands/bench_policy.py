@@ -0,0 +1,81 @@
+import time
+from dataclasses import dataclass
+
+from django.core.management.base import BaseCommand
+
+from accounts.models import CustomUser
+from accounts.policies import Permission, Policy, Role
+from blog.models import Post
+
+
+# Pre-bitmask Policy, kept only as the benchmark baseline: every check
+# re-reads the user flags, re-derives the role and does a dict + set lookup.
+_LEGACY_GRANTS = {
+    Role.ADMIN: set(Permission),
+    Role.AUTHOR: set(Permission),
+    Role.USER: {
+        Permission.ADMIN_ACCESS, Permission.POST_VIEW, Permission.COMMENT_VIEW,
+        Permission.COMMENT_ADD, Permission.COMMENT_CHANGE_OWN, Permission.COMMENT_DELETE_OWN,
+    },
+}
+
+
+@dataclass
+class LegacyPolicy:
+    user: object
+
+    def role(self):
+        if bool(getattr(self.user, "is_superuser", False)):
+            return Role.ADMIN
+        if bool(getattr(self.user, "is_author", False)):
+            return Role.AUTHOR
+        return Role.USER
+
+    def has(self, perm):
+        if not bool(getattr(self.user, "is_authenticated", False)) or not bool(getattr(self.user, "is_active", False)):
+            return False
+        return perm in _LEGACY_GRANTS.get(self.role(), set())
+
+    def is_owner(self, obj, owner_attr):
+        return obj is not None and getattr(obj, owner_attr, None) == self.user
+
+    def can_view_post(self, obj=None):
+        return self.has(Permission.POST_VIEW)
+
+    def can_change_post(self, obj=None):
+        return self.has(Permission.POST_CHANGE_OWN) and (obj is None or self.is_owner(obj, "author"))
+
+    def can_delete_post(self, obj=None):
+        return self.has(Permission.POST_DELETE_OWN) and (obj is None or self.is_owner(obj, "author"))
+
+
+class Command(BaseCommand):
+    help = "Microbenchmark Policy checks over a simulated admin changelist (legacy vs bitmask Policy)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=500)
+        parser.add_argument("--renders", type=int, default=200, help="Changelist renders to simulate")
+
+    def handle(self, *args, **options):
+        rows, renders = options["rows"], options["renders"]
+        # Unsaved model instances: realistic attribute/descriptor and __eq__ costs, no DB needed
+        user = CustomUser(id=7, email="author@example.com", is_author=True)
+        other = CustomUser(id=8, email="other@example.com", is_author=True)
+        posts = [Post(id=i, author=user if i % 3 else other) for i in range(rows)]
+
+        for label, factory in (("legacy", LegacyPolicy), ("bitmask", Policy)):
+            checks = 0
+            started = time.perf_counter()
+            for _ in range(renders):
+                # A fresh policy per request, as PolicyMiddleware does
+                policy = factory(user)
+                for post in posts:
+                    policy.can_view_post(post)
+                    policy.can_change_post(post)
+                    policy.can_delete_post(post)
+                    checks += 3
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{label:<8} {checks:>9,} checks in {elapsed * 1000:8.1f} ms "
+                f"({elapsed / checks * 1e9:6.0f} ns/check, {elapsed / renders * 1000:6.3f} ms per {rows}-row page)"
+            )
@@ -1,15 +1,32 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
 from .policies import Policy
 
 class PolicyMiddleware:
     """
     Attaches a Policy object to each request as `request.policy`.
     Policy chain prioritizes `is_superuser` first, then other common checks.
+    The policy resolves the user's role and grants lazily, once per request.
+
+    Runs natively under ASGI too. The policy wraps the lazy `request.user`, so
+    async views that check permissions must `await request.auser()` first;
+    read views that never consult it cost no session or user query.
     """
 
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        user = getattr(request, "user", None)
-        request.policy = Policy(user)
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.policy = Policy(getattr(request, "user", None))
         return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.policy = Policy(getattr(request, "user", None))
+        return await self.get_response(request)
@@ -1,6 +1,7 @@
-from dataclasses import dataclass
-from enum import Enum
-from typing import Dict, Set
+from enum import Enum, IntFlag
+from functools import reduce
+from operator import or_
+from typing import Dict
 
 
 class Role(str, Enum):
@@ -8,95 +9,195 @@ class Role(str, Enum):
     AUTHOR = "author"
     USER = "user"  # authenticated non-author
 
-class Permission(str, Enum):
-    ADMIN_ACCESS = "admin.access"
-    POST_VIEW = "post.view"
-    POST_ADD = "post.add"
-    POST_CHANGE_OWN = "post.change.own"
-    POST_DELETE_OWN = "post.delete.own"
-    COMMENT_VIEW = "comment.view"
-    COMMENT_ADD = "comment.add"
-    COMMENT_CHANGE_OWN = "comment.change.own"
-    COMMENT_DELETE_OWN = "comment.delete.own"
-
-
-# Central role -> permission grants (coarse-grained)
-ROLE_GRANTS: Dict[Role, Set[Permission]] = {
-    Role.ADMIN: set(p for p in Permission),  # full access
-    Role.AUTHOR: {
-        Permission.ADMIN_ACCESS,
-        Permission.POST_VIEW,
-        Permission.POST_ADD,
-        Permission.POST_CHANGE_OWN,
-        Permission.POST_DELETE_OWN,
-        Permission.COMMENT_VIEW,
-        Permission.COMMENT_ADD,
-        Permission.COMMENT_CHANGE_OWN,
-        Permission.COMMENT_DELETE_OWN,
-    },
-    Role.USER: {
-        Permission.ADMIN_ACCESS,
-        Permission.POST_VIEW,
-        Permission.COMMENT_VIEW,
-        Permission.COMMENT_ADD,
-        Permission.COMMENT_CHANGE_OWN,
-        Permission.COMMENT_DELETE_OWN,
-    },
+class Permission(IntFlag):
+    ADMIN_ACCESS = 1 << 0
+    POST_VIEW = 1 << 1
+    POST_ADD = 1 << 2
+    POST_CHANGE_OWN = 1 << 3
+    POST_DELETE_OWN = 1 << 4
+    COMMENT_VIEW = 1 << 5
+    COMMENT_ADD = 1 << 6
+    COMMENT_CHANGE_OWN = 1 << 7
+    COMMENT_DELETE_OWN = 1 << 8
+
+
+# Plain-int masks for the hot checks; IntFlag operators dispatch to Python-level enum code
+_ADMIN_ACCESS = int(Permission.ADMIN_ACCESS)
+_POST_VIEW = int(Permission.POST_VIEW)
+_POST_ADD = int(Permission.POST_ADD)
+_POST_CHANGE_OWN = int(Permission.POST_CHANGE_OWN)
+_POST_DELETE_OWN = int(Permission.POST_DELETE_OWN)
+_COMMENT_VIEW = int(Permission.COMMENT_VIEW)
+_COMMENT_ADD = int(Permission.COMMENT_ADD)
+_COMMENT_CHANGE_OWN = int(Permission.COMMENT_CHANGE_OWN)
+_COMMENT_DELETE_OWN = int(Permission.COMMENT_DELETE_OWN)
+
+# FK column for each ownership attribute, so ownership compares ids without loading the user
+_OWNER_COLUMNS = {"author": "author_id", "user": "user_id"}
+
+
+# Central role -> permission grants (coarse-grained), as bitmasks
+ROLE_GRANTS: Dict[Role, Permission] = {
+    Role.ADMIN: reduce(or_, Permission),  # full access
+    Role.AUTHOR: (
+        Permission.ADMIN_ACCESS
+        | Permission.POST_VIEW
+        | Permission.POST_ADD
+        | Permission.POST_CHANGE_OWN
+        | Permission.POST_DELETE_OWN
+        | Permission.COMMENT_VIEW
+        | Permission.COMMENT_ADD
+        | Permission.COMMENT_CHANGE_OWN
+        | Permission.COMMENT_DELETE_OWN
+    ),
+    Role.USER: (
+        Permission.ADMIN_ACCESS
+        | Permission.POST_VIEW
+        | Permission.COMMENT_VIEW
+        | Permission.COMMENT_ADD
+        | Permission.COMMENT_CHANGE_OWN
+        | Permission.COMMENT_DELETE_OWN
+    ),
 }
 
 
-@dataclass
 class Policy:
-    user: any
+    """
+    Role and permission checks for one user (one per request, see PolicyMiddleware).
+
+    Role, liveness and the effective grant mask are resolved on first use and
+    then frozen, so the dozens of has_*_permission calls an admin page makes
+    cost one integer AND each. Build a new Policy if the user changes.
+    """
+
+    __slots__ = ("user", "_user_id", "_role", "_active", "_grants")
+
+    def __init__(self, user):
+        self.user = user
+        self._user_id = None
+        self._role = None
+        self._active = False
+        self._grants = None
+
+    def __repr__(self):
+        return f"Policy(user={self.user!r})"
+
+    def _resolve(self):
+        user = self.user
+        if bool(getattr(user, "is_superuser", False)):
+            role = Role.ADMIN
+        elif bool(getattr(user, "is_author", False)):
+            role = Role.AUTHOR
+        else:
+            role = Role.USER
+        # Unauthenticated or inactive users have no permissions
+        active = bool(getattr(user, "is_authenticated", False)) and bool(getattr(user, "is_active", False))
+        self._user_id = getattr(user, "pk", None)
+        self._role = role
+        self._active = active
+        self._grants = int(ROLE_GRANTS[role]) if active else 0
 
     # Role resolution
     def role(self) -> Role:
-        if bool(getattr(self.user, "is_superuser", False)):
-            return Role.ADMIN
-        if bool(getattr(self.user, "is_author", False)):
-            return Role.AUTHOR
-        return Role.USER
+        if self._grants is None:
+            self._resolve()
+        return self._role
+
+    def is_superuser(self) -> bool:
+        return self.role() is Role.ADMIN and self._active
 
     # Permission check helper (admins get all by grant table)
     def has(self, perm: Permission) -> bool:
-        # Unauthenticated or inactive users have no permissions
-        if not bool(getattr(self.user, "is_authenticated", False)) or not bool(getattr(self.user, "is_active", False)):
-            return False
-        return perm in ROLE_GRANTS.get(self.role(), set())
+        grants = self._grants
+        if grants is None:
+            self._resolve()
+            grants = self._grants
+        mask = int(perm)
+        return grants & mask == mask
 
     # Generic object-ownership helper
     def is_owner(self, obj, owner_attr: str) -> bool:
-        return obj is not None and getattr(obj, owner_attr, None) == self.user
+        if obj is None:
+            return False
+        if self._grants is None:
+            self._resolve()
+        column = _OWNER_COLUMNS.get(owner_attr)
+        owner_id = getattr(obj, column, None) if column else None
+        if owner_id is not None:
+            return owner_id == self._user_id
+        return getattr(obj, owner_attr, None) == self.user
 
     # Admin access
     def can_access_admin(self) -> bool:
-        return self.has(Permission.ADMIN_ACCESS)
+        return self.has(_ADMIN_ACCESS)
 
     # Post
     def can_view_post(self, obj=None) -> bool:
-        return self.has(Permission.POST_VIEW)
+        return self.has(_POST_VIEW)
 
     def can_add_post(self) -> bool:
-        return self.has(Permission.POST_ADD)
+        return self.has(_POST_ADD)
 
     def can_change_post(self, obj=None) -> bool:
-        return self.has(Permission.POST_CHANGE_OWN) and (obj is None or self.is_owner(obj, "author"))
+        return self._may(_POST_CHANGE_OWN, obj, "author")
 
     def can_delete_post(self, obj=None) -> bool:
-        return self.has(Permission.POST_DELETE_OWN) and (obj is None or self.is_owner(obj, "author"))
+        return self._may(_POST_DELETE_OWN, obj, "author")
+
+    def can_publish_post(self, obj=None) -> bool:
+        # Admin, or the post's own author (ownership alone, no author-role grant needed)
+        if self.is_superuser():
+            return True
+        return self._active and (obj is None or self.is_owner(obj, "author"))
 
     # Comment
     def can_view_comment(self, obj=None) -> bool:
-        return self.has(Permission.COMMENT_VIEW)
+        return self.has(_COMMENT_VIEW)
 
     def can_add_comment(self) -> bool:
-        return self.has(Permission.COMMENT_ADD)
+        return self.has(_COMMENT_ADD)
 
     def can_change_comment(self, obj=None) -> bool:
-        return self.has(Permission.COMMENT_CHANGE_OWN) and (obj is None or self.is_owner(obj, "user"))
+        return self._may(_COMMENT_CHANGE_OWN, obj, "user")
 
     def can_delete_comment(self, obj=None) -> bool:
-        return self.has(Permission.COMMENT_DELETE_OWN) and (obj is None or self.is_owner(obj, "user"))
+        return self._may(_COMMENT_DELETE_OWN, obj, "user")
+
+    # Queryset counterparts of the checks above: the same rules as one SQL filter,
+    # so bulk actions and list pages never loop over rows in Python
+    def viewable_posts(self, queryset):
+        return queryset if self.has(_POST_VIEW) else queryset.none()
+
+    def editable_posts(self, queryset):
+        return self._owned(queryset, _POST_CHANGE_OWN, "author")
+
+    def deletable_posts(self, queryset):
+        return self._owned(queryset, _POST_DELETE_OWN, "author")
+
+    def publishable_posts(self, queryset):
+        if self.is_superuser():
+            return queryset
+        if not self._active:
+            return queryset.none()
+        return queryset.filter(author_id=self._user_id)
+
+    def viewable_comments(self, queryset):
+        return queryset if self.has(_COMMENT_VIEW) else queryset.none()
+
+    def editable_comments(self, queryset):
+        return self._owned(queryset, _COMMENT_CHANGE_OWN, "user")
+
+    def deletable_comments(self, queryset):
+        return self._owned(queryset, _COMMENT_DELETE_OWN, "user")
+
+    # The *_OWN grants hold for the user's own rows only, admins included
+    def _may(self, mask, obj, owner_attr) -> bool:
+        return self.has(mask) and (obj is None or self.is_owner(obj, owner_attr))
+
+    def _owned(self, queryset, mask, owner_attr):
+        if not self.has(mask):
+            return queryset.none()
+        return queryset.filter(**{_OWNER_COLUMNS[owner_attr]: self._user_id})
 
     # Readonly helpers used by admin UI
     def readonly_post_fields(self, obj=None, model=None):
@@ -104,7 +205,7 @@ class Policy:
         if self.role() is Role.ADMIN:
             return []
         # Non-authenticated and normal users: always readonly
-        if (not bool(getattr(self.user, "is_authenticated", False)) or not bool(getattr(self.user, "is_active", False))) or self.role() is Role.USER:
+        if not self._active or self._role is Role.USER:
             return [f.name for f in model._meta.fields] if model else []
         # Author: readonly if editing someone else's post
         if obj is not None and not self.is_owner(obj, "author"):
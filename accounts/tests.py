@@ -1,3 +1,66 @@
-from django.test import TestCase
+from types import SimpleNamespace
 
-# Create your tests here.
+from django.contrib.auth.models import AnonymousUser
+from django.test import SimpleTestCase
+
+from .policies import Permission, Policy, Role, ROLE_GRANTS
+
+
+class CountingUser(SimpleNamespace):
+    """User stub that counts how often Policy reads its flags."""
+
+    reads = 0
+
+    def __getattribute__(self, name):
+        if name.startswith("is_"):
+            type(self).reads += 1
+        return super().__getattribute__(name)
+
+
+class PolicyTests(SimpleTestCase):
+
+    def user(self, **flags):
+        flags.setdefault("pk", 1)
+        flags.setdefault("is_authenticated", True)
+        flags.setdefault("is_active", True)
+        flags.setdefault("is_superuser", False)
+        flags.setdefault("is_author", False)
+        return SimpleNamespace(**flags)
+
+    def test_roles_and_grants(self):
+        self.assertIs(Policy(self.user(is_superuser=True)).role(), Role.ADMIN)
+        self.assertIs(Policy(self.user(is_author=True)).role(), Role.AUTHOR)
+        self.assertIs(Policy(self.user()).role(), Role.USER)
+
+        reader = Policy(self.user())
+        self.assertTrue(reader.can_add_comment())
+        self.assertFalse(reader.can_add_post())
+        self.assertTrue(reader.has(Permission.POST_VIEW | Permission.COMMENT_VIEW))
+        self.assertFalse(reader.has(Permission.POST_VIEW | Permission.POST_ADD))
+        self.assertEqual(ROLE_GRANTS[Role.ADMIN], ~Permission(0))
+
+    def test_inactive_and_anonymous_have_no_permissions(self):
+        for user in (AnonymousUser(), self.user(is_active=False, is_superuser=True)):
+            policy = Policy(user)
+            self.assertFalse(policy.can_access_admin())
+            self.assertFalse(policy.can_view_post())
+            self.assertFalse(policy.is_superuser())
+
+    def test_ownership_uses_fk_column(self):
+        policy = Policy(self.user(pk=5, is_author=True))
+        self.assertTrue(policy.can_change_post(SimpleNamespace(author_id=5)))
+        self.assertFalse(policy.can_delete_post(SimpleNamespace(author_id=6)))
+        self.assertTrue(policy.can_change_post())
+
+    def test_resolves_user_once(self):
+        CountingUser.reads = 0
+        policy = Policy(CountingUser(pk=1, is_authenticated=True, is_active=True, is_superuser=False, is_author=True))
+        for _ in range(100):
+            policy.can_view_post()
+            policy.can_change_post(SimpleNamespace(author_id=1))
+            policy.readonly_post_fields()
+        self.assertEqual(CountingUser.reads, 4)
+
+    def test_slots(self):
+        with self.assertRaises(AttributeError):
+            Policy(self.user()).extra = 1
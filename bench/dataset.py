@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+
+from blog.management.commands.seed_data import BASE_NAMES
+from blog.models import Post
+
+# seed_data gives every user this password
+PASSWORD = "password123"
+
+SIZES = {
+    "small": {"users": 20, "posts": 500, "comments": 5_000, "depth": 2},
+    "medium": {"users": 50, "posts": 5_000, "comments": 100_000, "depth": 3},
+    "large": {"users": 200, "posts": 50_000, "comments": 1_000_000, "depth": 3},
+}
+
+
+@contextmanager
+def throwaway_database():
+    """
+    Point the default connection at a fresh, migrated test database for the
+    duration of the block, then drop it. SQLite gets a temporary file rather
+    than the in-memory test database, so WAL and the pragmas apply as in
+    production and a real server's threads see the same data.
+    """
+    directory = tempfile.mkdtemp(prefix="blog-bench-")
+    test_settings = connection.settings_dict.setdefault("TEST", {})
+    previous = test_settings.get("NAME")
+    if connection.vendor == "sqlite":
+        test_settings["NAME"] = os.path.join(directory, "bench.sqlite3")
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings["NAME"] = previous
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def seed(users, posts, comments, depth, seed=42):
+    """Deterministic dataset (same sizes and seed, same rows) via seed_data."""
+    call_command(
+        "seed_data", users=users, posts=posts, comments=comments, depth=depth, seed=seed, stdout=StringIO(),
+    )
+
+
+class Context:
+    """What the scenarios need to know about the seeded data."""
+
+    def __init__(self, sample=100):
+        # Most discussed first, so detail pages are representative of real traffic
+        self.post_ids = list(
+            Post.objects.filter(status="published").order_by("-comment_count", "id").values_list("id", flat=True)[:sample]
+        )
+        self.email = f"{BASE_NAMES[0].lower()}@example.com"
+        self.password = PASSWORD
@@ -0,0 +1,307 @@
+import asyncio
+import http.client
+import math
+import re
+import statistics
+import threading
+import time
+from dataclasses import dataclass, field
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from blog.comment_queue import reset_comment_queue
+
+# Production-like: no DEBUG query log, no budget enforcement, no replicas
+BENCH_SETTINGS = {
+    "DEBUG": False,
+    "ALLOWED_HOSTS": ["localhost", "127.0.0.1", "testserver"],
+    "DATABASE_REPLICAS": [],
+    "BLOG_QUERY_BUDGET_ENFORCE": False,
+}
+
+# Written by blog.middleware.RequestInstrumentationMiddleware (BLOG_SERVER_TIMING)
+_TIMING = re.compile(r'db;dur=([\d.]+);desc="(\d+) queries"')
+
+
+@dataclass
+class Scenario:
+    url_name: str
+    method: str = "GET"
+    expected: int = 200
+    login: bool = False
+    with_post: bool = False
+    data: object = None  # callable (context, n) -> form data
+    settings: dict = field(default_factory=dict)
+    drain: object = None  # callable run inside the timed window, after the last response
+
+    def request(self, context, n):
+        args = [context.post_ids[n % len(context.post_ids)]] if self.with_post else []
+        data = self.data(context, n) if self.data else None
+        return self.method, reverse(self.url_name, args=args), data
+
+
+SCENARIOS = {
+    "post_list": Scenario("api-post-list"),
+    "post_detail": Scenario("api-post-detail", with_post=True),
+    "post_comments": Scenario("api-post-comments", with_post=True),
+    "add_comment": Scenario(
+        "api-add-comment", "POST", expected=201, login=True, with_post=True,
+        data=lambda context, n: {"content": f"Benchmark comment {n}"},
+    ),
+    # Write-behind queue; closing it writes the rest, so rps is sustained inserts/sec
+    "add_comment_buffered": Scenario(
+        "api-add-comment", "POST", expected=202, login=True, with_post=True,
+        data=lambda context, n: {"content": f"Benchmark comment {n}"},
+        settings={"BLOG_COMMENT_WRITES": "buffered"}, drain=reset_comment_queue,
+    ),
+    # Dominated by the password hasher, by design
+    "session_login": Scenario(
+        "api-session-login", "POST",
+        data=lambda context, n: {"username": context.email, "password": context.password},
+    ),
+}
+
+
+def percentile(sorted_values, p):
+    # Nearest rank
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+# Drivers: each hands out one session (a client with its own cookies) per worker thread
+
+class ClientSession:
+    def __init__(self):
+        self.client = Client()
+
+    def send(self, method, path, data=None):
+        if method == "GET":
+            response = self.client.get(path, data)
+        else:
+            response = self.client.post(path, data or {})
+        return response.status_code, response.headers.get("Server-Timing", "")
+
+
+class ClientDriver:
+    """In process through django.test.Client: the app's cost without any HTTP."""
+
+    name = "client"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def session(self):
+        return ClientSession()
+
+
+class HTTPSession:
+    def __init__(self, host, port):
+        self.connection = http.client.HTTPConnection(host, port, timeout=60)
+        self.cookies = SimpleCookie()
+
+    def send(self, method, path, data=None):
+        headers = {"Host": "localhost"}
+        body = None
+        if data is not None and method == "GET":
+            path = f"{path}?{urlencode(data)}"
+        elif data is not None:
+            body = urlencode(data)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{key}={morsel.value}" for key, morsel in self.cookies.items())
+        try:
+            self.connection.request(method, path, body, headers)
+            response = self.connection.getresponse()
+        except (ConnectionError, http.client.HTTPException):
+            # The server closed a kept-alive connection; retry once on a new one
+            self.connection.close()
+            self.connection.request(method, path, body, headers)
+            response = self.connection.getresponse()
+        response.read()
+        for value in response.headers.get_all("Set-Cookie") or ():
+            self.cookies.load(value)
+        return response.status, response.headers.get("Server-Timing", "")
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class WSGIServerDriver:
+    """A real threaded WSGI server (the one behind runserver) on a free local port."""
+
+    name = "wsgi"
+
+    def __enter__(self):
+        self.server = ThreadedWSGIServer(("127.0.0.1", 0), QuietHandler, allow_reuse_address=False)
+        self.server.set_app(WSGIHandler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+        return False
+
+    def session(self):
+        host, port = self.server.server_address[:2]
+        return HTTPSession(host, port)
+
+
+class AsyncClientSession:
+    def __init__(self):
+        self.client = AsyncClient()
+
+    async def send(self, method, path, data=None):
+        if method == "GET":
+            response = await self.client.get(path, data)
+        else:
+            response = await self.client.post(path, data or {})
+        return response.status_code, response.headers.get("Server-Timing", "")
+
+
+class AsyncClientDriver(ClientDriver):
+    """In process through django.test.AsyncClient (the ASGI handler), one coroutine per session."""
+
+    name = "asgi"
+    asynchronous = True
+
+    def session(self):
+        return AsyncClientSession()
+
+
+DRIVERS = {"client": ClientDriver, "wsgi": WSGIServerDriver, "asgi": AsyncClientDriver}
+
+
+@dataclass
+class Result:
+    driver: str
+    scenario: str
+    concurrency: int
+    requests: int
+    latencies: list = field(default_factory=list)
+    queries: list = field(default_factory=list)
+    db_ms: list = field(default_factory=list)
+    errors: int = 0
+    seconds: float = 0.0
+
+    def summary(self):
+        latencies = sorted(self.latencies)
+        ms = lambda p: round(percentile(latencies, p) * 1000, 3)
+        return {
+            "driver": self.driver,
+            "scenario": self.scenario,
+            "concurrency": self.concurrency,
+            "requests": self.requests,
+            "errors": self.errors,
+            "seconds": round(self.seconds, 3),
+            "rps": round(self.requests / self.seconds, 1) if self.seconds else 0.0,
+            "p50_ms": ms(50),
+            "p95_ms": ms(95),
+            "p99_ms": ms(99),
+            "queries_per_request": round(statistics.fmean(self.queries), 2) if self.queries else None,
+            "db_ms_per_request": round(statistics.fmean(self.db_ms), 3) if self.db_ms else None,
+        }
+
+
+def run_scenario(driver, name, context, requests, concurrency):
+    """Send `requests` requests of scenario `name` from `concurrency` threads; returns a Result."""
+    scenario = SCENARIOS[name]
+    with override_settings(**scenario.settings):
+        return _run(driver, name, scenario, context, requests, concurrency)
+
+
+def _login(context):
+    return "POST", reverse("api-session-login"), {"username": context.email, "password": context.password}
+
+
+def _record(result, scenario, took, status, timing):
+    match = _TIMING.search(timing)
+    result.latencies.append(took)
+    if status != scenario.expected:
+        result.errors += 1
+    if match:
+        result.db_ms.append(float(match.group(1)))
+        result.queries.append(int(match.group(2)))
+
+
+def _run(driver, name, scenario, context, requests, concurrency):
+    if getattr(driver, "asynchronous", False):
+        return asyncio.run(_arun(driver, name, scenario, context, requests, concurrency))
+    sessions = [driver.session() for _ in range(concurrency)]
+    if scenario.login:
+        for session in sessions:
+            status, _ = session.send(*_login(context))
+            if status != 200:
+                raise RuntimeError(f"benchmark login failed with HTTP {status}")
+
+    result = Result(driver.name, name, concurrency, requests)
+    counter = iter(range(requests))
+    lock = threading.Lock()
+
+    def worker(session):
+        try:
+            while True:
+                with lock:
+                    n = next(counter, None)
+                if n is None:
+                    return
+                method, path, data = scenario.request(context, n)
+                started = time.perf_counter()
+                status, timing = session.send(method, path, data)
+                took = time.perf_counter() - started
+                with lock:
+                    _record(result, scenario, took, status, timing)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker, args=(session,)) for session in sessions]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if scenario.drain:
+        scenario.drain()
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+async def _arun(driver, name, scenario, context, requests, concurrency):
+    # Same loop as _run with coroutines for threads: one event loop, like an ASGI server
+    sessions = [driver.session() for _ in range(concurrency)]
+    if scenario.login:
+        for session in sessions:
+            status, _ = await session.send(*_login(context))
+            if status != 200:
+                raise RuntimeError(f"benchmark login failed with HTTP {status}")
+
+    result = Result(driver.name, name, concurrency, requests)
+    counter = iter(range(requests))
+
+    async def worker(session):
+        for n in counter:
+            method, path, data = scenario.request(context, n)
+            started = time.perf_counter()
+            status, timing = await session.send(method, path, data)
+            _record(result, scenario, time.perf_counter() - started, status, timing)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(session) for session in sessions))
+    if scenario.drain:
+        await asyncio.to_thread(scenario.drain)
+    result.seconds = time.perf_counter() - started
+    return result
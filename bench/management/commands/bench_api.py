@@ -0,0 +1,119 @@
+import json
+import platform
+import subprocess
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from bench.dataset import SIZES, Context, seed, throwaway_database
+from bench.load import BENCH_SETTINGS, DRIVERS, SCENARIOS, run_scenario
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway database and load-test the blog API through the test client, the async "
+        "test client (ASGI) and a real WSGI server. Writes a JSON report (throughput, p50/p95/p99, queries per request)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", choices=SIZES, default="small", help="Dataset preset")
+        for name in ("users", "posts", "comments", "depth"):
+            parser.add_argument(f"--{name}", type=int, help=f"Override the preset's {name}")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--driver", choices=DRIVERS, action="append", help="Default: all (repeatable)")
+        parser.add_argument("--scenario", choices=SCENARIOS, action="append", help="Default: all (repeatable)")
+        parser.add_argument("--requests", type=int, default=500, help="Timed requests per scenario")
+        parser.add_argument("--login-requests", type=int, default=20, help="Timed requests for session_login")
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--warmup", type=int, default=20)
+        parser.add_argument("--cache", action="store_true", help="Keep the response cache on")
+        parser.add_argument("-o", "--output", help="Write the JSON report here (default: stdout)")
+        parser.add_argument("--compare", help="A previous report to print deltas against")
+
+    def handle(self, *args, **options):
+        dataset = {name: options[name] if options[name] is not None else value
+                   for name, value in SIZES[options["size"]].items()}
+        dataset["seed"] = options["seed"]
+        drivers = options["driver"] or list(DRIVERS)
+        scenarios = options["scenario"] or list(SCENARIOS)
+        concurrency = max(1, options["concurrency"])
+        baseline = self.load(options["compare"]) if options["compare"] else None
+
+        overrides = {
+            **BENCH_SETTINGS,
+            # Queries per request are read back from the Server-Timing header
+            "BLOG_SERVER_TIMING": True,
+        }
+        if not options["cache"]:
+            overrides["BLOG_CACHE_TIMEOUT"] = 0
+
+        results = []
+        with override_settings(**overrides), throwaway_database():
+            self.stderr.write(f"Seeding {dataset} ...")
+            seed(**dataset)
+            context = Context()
+            if not context.post_ids:
+                raise CommandError("The dataset has no published posts; use more --posts.")
+            for driver_name in drivers:
+                with DRIVERS[driver_name]() as driver:
+                    for name in scenarios:
+                        requests = options["login_requests"] if name == "session_login" else options["requests"]
+                        cache.clear()
+                        run_scenario(driver, name, context, min(options["warmup"], requests), concurrency)
+                        summary = run_scenario(driver, name, context, requests, concurrency).summary()
+                        results.append(summary)
+                        self.stderr.write(self.line(summary, baseline))
+
+        report = {
+            "meta": {
+                "commit": self.commit(),
+                "created_at": timezone.now().isoformat(),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connection.vendor,
+                "dataset": dataset,
+                "cache": options["cache"],
+            },
+            "results": results,
+        }
+        text = json.dumps(report, indent=2, sort_keys=True) + "\n"
+        if options["output"]:
+            Path(options["output"]).write_text(text)
+        else:
+            self.stdout.write(text, ending="")
+
+    def line(self, summary, baseline):
+        line = (
+            f"{summary['driver']:<7}{summary['scenario']:<22}{summary['rps']:>9,.1f} req/s"
+            f"  p50 {summary['p50_ms']:8.2f}  p95 {summary['p95_ms']:8.2f}  p99 {summary['p99_ms']:8.2f} ms"
+            f"  {summary['queries_per_request']} q/req  {summary['errors']} errors"
+        )
+        previous = (baseline or {}).get((summary["driver"], summary["scenario"]))
+        if previous and previous["rps"] and previous["p99_ms"]:
+            line += (
+                f"  (rps {(summary['rps'] / previous['rps'] - 1) * 100:+.0f}%,"
+                f" p99 {(summary['p99_ms'] / previous['p99_ms'] - 1) * 100:+.0f}%)"
+            )
+        return line
+
+    def load(self, path):
+        try:
+            report = json.loads(Path(path).read_text())
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Can't read {path}: {exc}")
+        return {(r["driver"], r["scenario"]): r for r in report["results"]}
+
+    def commit(self):
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
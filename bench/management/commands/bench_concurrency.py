@@ -0,0 +1,82 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from bench.dataset import Context
+from bench.load import BENCH_SETTINGS, DRIVERS, SCENARIOS, run_scenario
+
+# Mode -> bench.load driver: the sync test client on threads, AsyncClient on coroutines
+MODES = {"wsgi": "client", "asgi": "asgi"}
+READ_SCENARIOS = ["post_list", "post_detail", "post_comments"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the read API in process: sync views on a thread pool vs the native async "
+        "views on coroutines, at the same concurrency, on the current database. Reports req/s, p50 and p99."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000, help="Timed requests per mode and scenario")
+        parser.add_argument("--concurrency", type=int, default=64, help="Threads (WSGI) / coroutines (ASGI)")
+        parser.add_argument("--warmup", type=int, default=50)
+        parser.add_argument("--cache", action="store_true", help="Keep the response cache on (off by default)")
+        parser.add_argument("--mode", choices=MODES, action="append", help="Only these modes (repeatable)")
+        parser.add_argument("--scenario", choices=SCENARIOS, action="append", help=f"Default: {', '.join(READ_SCENARIOS)}")
+        # Internal: one mode per child process, since the URLconf picks sync or async views at import
+        parser.add_argument("--run", choices=MODES, help="Run one mode and print its results as JSON")
+
+    def handle(self, *args, **options):
+        scenarios = options["scenario"] or READ_SCENARIOS
+        if options["run"]:
+            self.stdout.write(json.dumps(self.run_mode(options["run"], scenarios, options)))
+            return
+
+        results = []
+        for mode in options["mode"] or MODES:
+            env = dict(os.environ, BLOG_ASYNC_VIEWS="1" if mode == "asgi" else "0")
+            if not options["cache"]:
+                env["BLOG_CACHE_TIMEOUT"] = "0"
+            command = [
+                sys.executable, "-m", "django", "bench_concurrency", "--run", mode,
+                "--requests", str(options["requests"]),
+                "--concurrency", str(options["concurrency"]),
+                "--warmup", str(options["warmup"]),
+            ]
+            for name in scenarios:
+                command += ["--scenario", name]
+            child = subprocess.run(command, env=env, cwd=settings.BASE_DIR, capture_output=True, text=True)
+            if child.returncode:
+                raise CommandError(f"{mode} run failed:\n{child.stderr}")
+            results += json.loads(child.stdout.strip().splitlines()[-1])
+
+        self.stdout.write(
+            f"{'mode':<6}{'scenario':<22}{'conc':>6}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}"
+        )
+        for r in results:
+            self.stdout.write(
+                f"{r['mode']:<6}{r['scenario']:<22}{r['concurrency']:>6}{r['requests']:>10}{r['rps']:>10,.0f}"
+                f"{r['p50_ms']:>10.1f}{r['p99_ms']:>10.1f}{r['errors']:>8}"
+            )
+
+    # One mode, in this process
+
+    def run_mode(self, mode, scenarios, options):
+        context = Context()
+        if not context.post_ids:
+            raise CommandError("No published posts; run seed_data first.")
+        concurrency = max(1, options["concurrency"])
+        results = []
+        with override_settings(**BENCH_SETTINGS), DRIVERS[MODES[mode]]() as driver:
+            for name in scenarios:
+                cache.clear()
+                run_scenario(driver, name, context, options["warmup"], concurrency)
+                summary = run_scenario(driver, name, context, options["requests"], concurrency).summary()
+                results.append({"mode": mode, **summary})
+        return results
@@ -0,0 +1,47 @@
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+
+from blog.models import Comment, Post
+from .dataset import PASSWORD, Context
+from .load import AsyncClientDriver, ClientDriver, percentile, run_scenario
+
+
+class PercentileTests(SimpleTestCase):
+
+    def test_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual((percentile(values, 50), percentile(values, 99), percentile(values, 100)), (50, 99, 100))
+        self.assertEqual(percentile([], 50), 0.0)
+
+
+# Worker threads use their own connections, so the rows must be committed
+@override_settings(BLOG_SERVER_TIMING=True, BLOG_CACHE_TIMEOUT=0)
+class RunScenarioTests(TransactionTestCase):
+
+    def setUp(self):
+        author = get_user_model().objects.create_user(email="alice@example.com", password=PASSWORD, is_author=True)
+        for i in range(3):
+            Post.objects.create(author=author, title=f"Post {i}", content="Body", status="published")
+        self.context = Context()
+
+    def test_reads_and_writes_report_latency_and_queries(self):
+        with ClientDriver() as driver:
+            listing = run_scenario(driver, "post_list", self.context, requests=6, concurrency=2).summary()
+            comments = run_scenario(driver, "add_comment", self.context, requests=3, concurrency=1).summary()
+            buffered = run_scenario(driver, "add_comment_buffered", self.context, requests=4, concurrency=2).summary()
+
+        self.assertEqual((listing["requests"], listing["errors"]), (6, 0))
+        self.assertGreater(listing["rps"], 0)
+        self.assertLessEqual(listing["p50_ms"], listing["p99_ms"])
+        self.assertGreater(listing["queries_per_request"], 0)
+        self.assertEqual(comments["errors"], 0)
+        self.assertEqual(Post.objects.filter(comments__isnull=False).distinct().count(), 3)
+        # Every accepted comment is written by the time the run is timed
+        self.assertEqual(buffered["errors"], 0)
+        self.assertEqual(Comment.objects.count(), 7)
+
+    def test_async_driver_runs_sessions_as_coroutines(self):
+        with AsyncClientDriver() as driver:
+            summary = run_scenario(driver, "post_comments", self.context, requests=6, concurrency=3).summary()
+        self.assertEqual((summary["driver"], summary["requests"], summary["errors"]), ("asgi", 6, 0))
+        self.assertGreater(summary["queries_per_request"], 0)
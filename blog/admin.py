@@ -3,7 +3,10 @@ from django import forms
 from django.contrib.auth.forms import AuthenticationForm
 from django.urls import path
 from django.http import HttpResponse
+from accounts.policies import Policy
 from .models import Post, Comment
+from .cache import bump_global_version
+from .search import search_backend, search_terms
 
 
 # Small helpers to keep admin code DRY
@@ -13,19 +16,72 @@ def _ro(request):
 def _auth_active(request):
     return request.user.is_authenticated and request.user.is_active
 
-def _allowed_author_queryset(queryset, request):
-    ro = _ro(request)
-    if ro and not ro.is_superuser():
-        return queryset.filter(author=request.user)
-    if not getattr(request.user, "is_superuser", False):
-        return queryset.filter(author=request.user)
-    return queryset
+def _policy(request):
+    return _ro(request) or Policy(request.user)
+
+# Post bulk actions: superusers act on every selected row, everyone else on their own
+def _bulk_posts(request, scope, queryset):
+    return queryset if request.user.is_superuser else scope(queryset)
+
+
+# Changelists hide trashed rows unless the Trash filter is picked
+class TrashFilter(admin.SimpleListFilter):
+    title = "trash"
+    parameter_name = "trash"
+
+    def lookups(self, request, model_admin):
+        return (("trashed", "In Trash"),)
+
+    def queryset(self, request, queryset):
+        if self.value() == "trashed":
+            return queryset.trashed()
+        return queryset.live()
+
+
+class SoftDeleteAdminMixin:
+    # Start from all_objects so the Trash filter and change pages can reach deleted rows
+    def get_queryset(self, request):
+        qs = self.model.all_objects.get_queryset()
+        ordering = self.get_ordering(request)
+        if ordering:
+            qs = qs.order_by(*ordering)
+        return qs
+
+
+# A comment's path, depth and its post's counters are derived from `post` and
+# `parent` when it is inserted, so an existing comment can't be moved
+
+COMMENT_PLACEMENT_FIELDS = ('post', 'parent')
+
+
+class CommentForm(forms.ModelForm):
+    class Meta:
+        model = Comment
+        fields = '__all__'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        parent = cleaned_data.get('parent')
+        # The inline formset sets post_id on the instance; the add form has a post field
+        post = cleaned_data.get('post')
+        post_id = post.pk if post is not None else self.instance.post_id
+        if parent is not None and parent.post_id != post_id:
+            self.add_error('parent', "The parent comment belongs to a different post.")
+        return cleaned_data
+
+
+class CommentInlineForm(CommentForm):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk is not None and 'parent' in self.fields:
+            self.fields['parent'].disabled = True
 
 
 # Inline comments
 
 class CommentInline(admin.TabularInline):
     model = Comment
+    form = CommentInlineForm
     extra = 0
     readonly_fields = ('created_at', 'updated_at')
 
@@ -39,18 +95,27 @@ class CommentInline(admin.TabularInline):
 
 # POST ADMIN 
 
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(SoftDeleteAdminMixin, admin.ModelAdmin):
 
     list_display = ('id', 'title', 'status', 'created_at', 'updated_at')
-    list_filter = ('status', 'created_at')
+    list_filter = (TrashFilter, 'status', 'created_at')
     search_fields = ('title', 'content')
+    readonly_fields = ('comment_count', 'last_activity_at')
     inlines = [CommentInline]
-    actions = ['soft_delete_posts', 'publish_posts']
+    actions = ['soft_delete_posts', 'restore_posts', 'publish_posts', 'archive_posts']
 
     def get_queryset(self, request):
         qs = super().get_queryset(request)
         # Authors can see all posts (view-only for others), admin sees all
-        return qs
+        return _policy(request).viewable_posts(qs)
+
+    def get_search_results(self, request, queryset, search_term):
+        # Full-text index instead of LIKE '%term%' scans when the database has one
+        backend = search_backend()
+        terms = search_terms(search_term)
+        if not backend.indexed or not terms:
+            return super().get_search_results(request, queryset, search_term)
+        return backend.filter(queryset, terms), False
 #-> permission for the  regular user who can edit post
     def get_readonly_fields(self, request, obj=None):
         ro = _ro(request)
@@ -101,50 +166,86 @@ class PostAdmin(admin.ModelAdmin):
             obj.created_by = request.user.email
         obj.updated_by = request.user.email
         super().save_model(request, obj, form, change)
+        bump_global_version()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        bump_global_version()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        bump_global_version()
 
     # Ensure inline comments set user automatically to the requester
     def save_formset(self, request, form, formset, change):
         instances = formset.save(commit=False)
+        added = 0
         for inst in instances:
             if isinstance(inst, Comment) and not inst.pk:
                 inst.user = request.user
                 inst.created_by = request.user.email
+                added += 1
             inst.updated_by = request.user.email
             inst.save()
         formset.save_m2m()
-
-    # Soft delete action
+        # Inline "delete" ticks move comments to Trash (soft_delete keeps the counters right)
+        for inst in formset.deleted_objects:
+            inst.soft_delete()
+        if instances or formset.deleted_objects:
+            Post.track_comments(form.instance.pk, added)
+            bump_global_version()
+
+    # Bulk actions: each is a single UPDATE (soft delete also cascades to comments)
     def soft_delete_posts(self, request, queryset):
-        allowed = _allowed_author_queryset(queryset, request)
-        for post in allowed:
-            post.soft_delete()
-        self.message_user(request, "Selected posts moved to Trash.")
+        count = _bulk_posts(request, _policy(request).deletable_posts, queryset).soft_delete(by=request.user)
+        bump_global_version()
+        self.message_user(request, f"{count} selected posts moved to Trash.")
     soft_delete_posts.short_description = "Move selected posts to Trash"
 
-    # Publish action
+    def restore_posts(self, request, queryset):
+        count = _bulk_posts(request, _policy(request).deletable_posts, queryset).restore(by=request.user)
+        bump_global_version()
+        self.message_user(request, f"{count} selected posts restored from Trash.")
+    restore_posts.short_description = "Restore selected posts from Trash"
+
     def publish_posts(self, request, queryset):
-        allowed = _allowed_author_queryset(queryset, request)
-        allowed.update(status='published')
-        self.message_user(request, "Selected posts published.")
+        count = _policy(request).publishable_posts(queryset).publish(by=request.user)
+        bump_global_version()
+        self.message_user(request, f"{count} selected posts published.")
     publish_posts.short_description = "Publish selected posts"
 
+    def archive_posts(self, request, queryset):
+        count = _policy(request).publishable_posts(queryset).archive(by=request.user)
+        bump_global_version()
+        self.message_user(request, f"{count} selected posts archived.")
+    archive_posts.short_description = "Archive selected posts"
+
 
 
 # COMMENT ADMIN
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(SoftDeleteAdminMixin, admin.ModelAdmin):
 
+    form = CommentForm
     list_display = ('id', 'post', 'user_id', 'created_at', 'updated_at')
+    list_filter = (TrashFilter,)
+    list_select_related = ('post',)
+    actions = ['soft_delete_comments', 'restore_comments']
+
+    def get_queryset(self, request):
+        return _policy(request).viewable_comments(super().get_queryset(request))
     search_fields = ('content',)
 
     def get_readonly_fields(self, request, obj=None):
+        fields = []
         ro = _ro(request)
         if ro:
             fields = ro.readonly_comment_fields(obj=obj, model=self.model)
-            if fields:
-                return fields
-        return super().get_readonly_fields(request, obj)
+        fields = list(fields or super().get_readonly_fields(request, obj))
+        if obj is not None:
+            fields += [name for name in COMMENT_PLACEMENT_FIELDS if name not in fields]
+        return fields
 
     def has_view_permission(self, request, obj=None):
         ro = _ro(request)
@@ -185,6 +286,34 @@ class CommentAdmin(admin.ModelAdmin):
             obj.created_by = request.user.email
         obj.updated_by = request.user.email
         super().save_model(request, obj, form, change)
+        Post.track_comments(obj.post_id, 0 if change else +1)
+        # Either way last_activity_at moves, and the list shows it
+        bump_global_version()
+
+    # Bulk actions: one UPDATE for the rows the user may delete, one stats refresh
+    def soft_delete_comments(self, request, queryset):
+        count = _policy(request).deletable_comments(queryset).soft_delete(by=request.user)
+        bump_global_version()
+        self.message_user(request, f"{count} selected comments moved to Trash.")
+    soft_delete_comments.short_description = "Move selected comments to Trash"
+
+    def restore_comments(self, request, queryset):
+        count = _policy(request).deletable_comments(queryset).restore(by=request.user)
+        bump_global_version()
+        self.message_user(request, f"{count} selected comments restored from Trash.")
+    restore_comments.short_description = "Restore selected comments from Trash"
+
+    # Hard deletes cascade to replies, so recount rather than decrement
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        Post.all_objects.filter(pk=obj.post_id).refresh_comment_stats()
+        bump_global_version()
+
+    def delete_queryset(self, request, queryset):
+        post_ids = list(queryset.values_list('post_id', flat=True).distinct())
+        super().delete_queryset(request, queryset)
+        Post.all_objects.filter(pk__in=post_ids).refresh_comment_stats()
+        bump_global_version()
 
 
 
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class BlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from .instrumentation import install
+
+        # Per-request query accounting (see RequestInstrumentationMiddleware)
+        connection_created.connect(install, dispatch_uid="blog.instrumentation")
@@ -0,0 +1,75 @@
+"""
+Native async versions of the read-only API views, served under ASGI (see
+BLOG_ASYNC_VIEWS). They share validators, cache keys, pagination and payload
+building with blog.views; only the query execution goes through the async
+ORM, so a request waiting on the database doesn't hold a worker thread.
+"""
+from django.http import QueryDict
+from django.shortcuts import aget_object_or_404
+
+from .cache import cache_response, post_comments_key, post_detail_key, post_list_key
+from .comment_tree import acomment_page
+from .conditional import (
+    apost_comments_validators, apost_detail_validators, apost_list_validators, conditional_response,
+)
+from .models import Comment, Post
+from .pagination import CursorError, akeyset_page, parse_limit
+from .routers import replica_reads
+from .serialization import json_response
+from .views import (
+    comment_page_options, json_error, post_comments_data, post_detail_data,
+    post_list_data, published_posts,
+)
+
+
+@replica_reads
+@conditional_response(apost_list_validators)
+@cache_response(post_list_key)
+async def post_list_api(request):
+    try:
+        limit = parse_limit(request.GET.get("limit"))
+        posts, next_cursor, prev_cursor = await akeyset_page(
+            published_posts(),
+            cursor=request.GET.get("cursor"),
+            limit=limit,
+        )
+    except CursorError as exc:
+        return json_error(str(exc), 400)
+    return json_response(post_list_data(request, posts, next_cursor, prev_cursor))
+
+
+async def aload_comments(request, post_pk, params, parent_id=None):
+    return await acomment_page(post_pk, parent_id=parent_id, **comment_page_options(request, post_pk, params))
+
+
+@replica_reads
+@conditional_response(apost_detail_validators)
+@cache_response(post_detail_key)
+async def post_detail_api(request, pk):
+    post = await aget_object_or_404(
+        Post.objects.select_related('author'),
+        pk=pk, status='published',
+    )
+    params = QueryDict(mutable=True)
+    comments, next_cursor, _ = await aload_comments(request, post.id, params)
+    return json_response(post_detail_data(request, post, comments, next_cursor, params))
+
+
+@replica_reads
+@conditional_response(apost_comments_validators)
+@cache_response(post_comments_key)
+async def post_comments_api(request, pk):
+    post = await aget_object_or_404(Post.objects.only('id'), pk=pk, status='published')
+    parent_id = request.GET.get("parent") or None
+    if parent_id is not None:
+        # isdigit() alone also accepts digits such as "²" that int() rejects
+        if not (parent_id.isascii() and parent_id.isdigit()):
+            return json_error("parent comment not found", 404)
+        parent_id = int(parent_id)
+        if not await Comment.objects.filter(pk=parent_id, post=post).aexists():
+            return json_error("parent comment not found", 404)
+    try:
+        comments, next_cursor, prev_cursor = await aload_comments(request, post.id, request.GET, parent_id)
+    except CursorError as exc:
+        return json_error(str(exc), 400)
+    return json_response(post_comments_data(request, parent_id, comments, next_cursor, prev_cursor))
@@ -0,0 +1,176 @@
+import hashlib
+import threading
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+# Bodies are stored under the ETag the request was validated against (see
+# conditional_response), so a body only ever goes out with the validator of
+# the rows it was rendered from, whichever process or replica changed them.
+# Hard deletes and counter repairs leave no updated_at behind, so they bump
+# the global version, which is part of the list and detail ETags.
+GLOBAL_VERSION_KEY = "blog:v:global"
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def _cache():
+    return caches[getattr(settings, "BLOG_CACHE_ALIAS", "default")]
+
+
+def _timeout():
+    return getattr(settings, "BLOG_CACHE_TIMEOUT", 300)
+
+
+def _fresh_version():
+    # Time based so a version evicted from the cache never restarts at a value
+    # that older cached responses were stored under
+    return time.time_ns()
+
+
+def _versions(*keys):
+    cache = _cache()
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, _fresh_version(), None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+async def _aversions(*keys):
+    cache = _cache()
+    found = await cache.aget_many(keys)
+    for key in keys:
+        if key not in found:
+            await cache.aadd(key, _fresh_version(), None)
+            found[key] = await cache.aget(key)
+    return [found[key] for key in keys]
+
+
+def _bump(key):
+    cache = _cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _fresh_version(), None)
+
+
+def global_version():
+    (version,) = _versions(GLOBAL_VERSION_KEY)
+    return version
+
+
+async def aglobal_version():
+    (version,) = await _aversions(GLOBAL_VERSION_KEY)
+    return version
+
+
+def bump_global_version():
+    _bump(GLOBAL_VERSION_KEY)
+
+
+def _record(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def cache_stats():
+    with _stats_lock:
+        hits, misses = _stats["hits"], _stats["misses"]
+    total = hits + misses
+    return {"hits": hits, "misses": misses, "hit_ratio": hits / total if total else 0.0}
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        _stats.update(hits=0, misses=0)
+
+
+def _representation_key(kind, request, *parts):
+    etag = getattr(request, "blog_etag", None)
+    if etag is None:
+        return None
+    # Absolute URI: the body embeds next/previous links built from scheme and host
+    digest = hashlib.md5(f"{etag}:{request.build_absolute_uri()}".encode()).hexdigest()
+    return ":".join(["blog", kind, *map(str, parts), digest])
+
+
+def post_list_key(request):
+    return _representation_key("list", request)
+
+
+def post_detail_key(request, pk):
+    return _representation_key("detail", request, pk)
+
+
+def post_comments_key(request, pk):
+    return _representation_key("comments", request, pk)
+
+
+def cache_response(key_func):
+    """
+    Serve successful JSON bodies from the cache, keyed by `key_func`.
+
+    Goes under @conditional_response: the keys are built from the ETag it
+    computed, and without one (no validators) the view is not cached.
+    """
+
+    def found(request, body):
+        # Read by the request metrics (hit/miss per route)
+        request.blog_cache = "miss" if body is None else "hit"
+        if body is None:
+            _record("misses")
+            return None
+        _record("hits")
+        return HttpResponse(body, content_type="application/json")
+
+    def lookup(request, args, kwargs):
+        # (cached response or None, key to store a fresh body under or None)
+        key = key_func(request, *args, **kwargs)
+        if key is None:
+            return None, None
+        return found(request, _cache().get(key)), key
+
+    def store(key, response, timeout):
+        if key is not None and response.status_code == 200:
+            _cache().set(key, response.content, timeout)
+        return response
+
+    def decorator(view):
+        # Async views use the async cache API, so the file backend's disk I/O
+        # runs off the event loop
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                timeout = _timeout()
+                if not timeout:
+                    return await view(request, *args, **kwargs)
+                key = key_func(request, *args, **kwargs)
+                if key is None:
+                    return await view(request, *args, **kwargs)
+                cached = found(request, await _cache().aget(key))
+                if cached is not None:
+                    return cached
+                response = await view(request, *args, **kwargs)
+                if response.status_code == 200:
+                    await _cache().aset(key, response.content, timeout)
+                return response
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            timeout = _timeout()
+            if not timeout:
+                return view(request, *args, **kwargs)
+            cached, key = lookup(request, args, kwargs)
+            if cached is not None:
+                return cached
+            return store(key, view(request, *args, **kwargs), timeout)
+        return wrapper
+    return decorator
@@ -0,0 +1,42 @@
+import time
+
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Concat
+
+from .models import path_segment_sql
+
+
+def backfill_paths(queryset, progress=None):
+    """
+    Recompute Comment.path / depth for every row of `queryset` in SQL.
+
+    Paths are cleared, then written one tree level per UPDATE: roots, then
+    rows whose parent was written by the previous level. No rows pass through
+    Python, so the cost is (max depth + 2) statements whatever the row count.
+    `progress(depth, rows, rows_per_sec)` is called once per level. Returns
+    the number of rows written; call it inside a transaction.
+    """
+    queryset = queryset.order_by()
+    started = time.perf_counter()
+    queryset.update(path='', depth=0)
+    parent_path = Subquery(
+        queryset.model._base_manager.filter(pk=OuterRef('parent_id')).values('path')[:1]
+    )
+
+    total = 0
+    depth = 0
+    level = queryset.filter(parent__isnull=True)
+    segment = path_segment_sql()
+    while True:
+        if depth:
+            # Parents written by the previous level are the only ones at depth - 1 with a path
+            level = queryset.filter(path='', parent__depth=depth - 1).exclude(parent__path='')
+            written = level.update(path=Concat(parent_path, segment), depth=depth)
+        else:
+            written = level.update(path=segment, depth=0)
+        if not written:
+            return total
+        total += written
+        if progress:
+            progress(depth, written, total / max(time.perf_counter() - started, 1e-9))
+        depth += 1
@@ -0,0 +1,346 @@
+"""
+Write-behind comment inserts (BLOG_COMMENT_WRITES = 'buffered').
+
+add_comment_api validates a comment as usual, then queues it here and
+answers 202 with a provisional id. A background thread per process writes
+the queue in batches (BLOG_COMMENT_BATCH_SIZE rows, or whatever arrived
+within BLOG_COMMENT_FLUSH_SECONDS of the oldest one): one transaction with
+a single bulk INSERT, a bulk path UPDATE and one counter UPDATE per post,
+instead of a transaction per comment fighting for SQLite's write lock.
+
+With BLOG_COMMENT_SPOOL_DIR set, every queued comment is also appended to
+<dir>/comments-<pid>.ndjson before the request is answered. A batch's spool
+is renamed aside while it is written and removed once committed; at start
+each worker claims the files of processes that are no longer running and
+writes them, skipping rows that already made it to the database.
+"""
+import atexit
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DatabaseError, close_old_connections, transaction
+from django.utils import timezone
+
+from .cache import bump_global_version
+from .models import Comment, Post, path_segment
+
+logger = logging.getLogger("blog.comments")
+
+MODES = ("sync", "buffered")
+
+
+def buffered_writes():
+    mode = getattr(settings, "BLOG_COMMENT_WRITES", "sync")
+    if mode not in MODES:
+        raise ImproperlyConfigured(f"BLOG_COMMENT_WRITES must be 'sync' or 'buffered', got {mode!r}")
+    return mode == "buffered"
+
+
+@dataclass
+class PendingComment:
+    """A validated comment that is not in the database yet."""
+
+    id: str
+    post_id: int
+    parent_id: int
+    parent_path: str
+    depth: int
+    user_id: int
+    email: str
+    content: str
+    created_at: datetime
+
+    @classmethod
+    def new(cls, post, parent, user, content):
+        return cls(
+            id=f"pending-{uuid.uuid4().hex}",
+            post_id=post.id,
+            parent_id=parent.id if parent else None,
+            parent_path=parent.path if parent else "",
+            depth=parent.depth + 1 if parent else 0,
+            user_id=user.id,
+            email=user.email,
+            content=content,
+            created_at=timezone.now(),
+        )
+
+    def as_json(self):
+        # Same shape as the 201 response; the id can't be used as a parent until written
+        return {
+            "id": self.id,
+            "pending": True,
+            "post_id": self.post_id,
+            "parent_id": self.parent_id,
+            "depth": self.depth,
+            "user": self.email,
+            "content": self.content,
+            "created_at": self.created_at,
+        }
+
+    def dump(self):
+        return json.dumps({**asdict(self), "created_at": self.created_at.isoformat()}) + "\n"
+
+    @classmethod
+    def load(cls, line):
+        record = json.loads(line)
+        record["created_at"] = datetime.fromisoformat(record["created_at"])
+        return cls(**record)
+
+
+def write_comments(pending):
+    """
+    Insert `pending` comments in one transaction; returns how many were written.
+    Comments whose post was trashed or unpublished since they were queued are dropped.
+    """
+    with transaction.atomic():
+        live = set(
+            Post.objects.filter(pk__in={p.post_id for p in pending}, status="published")
+            .values_list("id", flat=True)
+        )
+        keep = [p for p in pending if p.post_id in live]
+        if len(keep) < len(pending):
+            logger.warning("Dropped %d queued comments: post no longer published", len(pending) - len(keep))
+        if not keep:
+            return 0
+        comments = Comment.all_objects.bulk_create([
+            Comment(
+                post_id=p.post_id, parent_id=p.parent_id, user_id=p.user_id, content=p.content,
+                depth=p.depth, created_at=p.created_at, created_by=p.email, updated_by=p.email,
+            )
+            for p in keep
+        ])
+        # The path ends with the row's own id, so it is written once the INSERT returned the ids
+        for comment, p in zip(comments, keep):
+            comment.path = p.parent_path + path_segment(comment.pk)
+        Comment.all_objects.bulk_update(comments, ["path"])
+        per_post = defaultdict(list)
+        for comment in comments:
+            per_post[comment.post_id].append(comment.updated_at)
+        for post_id, stamps in per_post.items():
+            Post.track_comments(post_id, len(stamps), at=max(stamps))
+    bump_global_version()
+    return len(comments)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class CommentQueue:
+    """In-process queue of PendingComment, written by a background thread."""
+
+    def __init__(self, batch_size=200, interval=0.05, max_pending=5000, spool_dir=None, pid=None):
+        self.batch_size = max(1, batch_size)
+        self.interval = interval
+        self.max_pending = max_pending
+        self.pid = pid or os.getpid()
+        self.pending = []
+        self.oldest = 0.0
+        self.lock = threading.Lock()
+        self.ready = threading.Condition(self.lock)
+        # One writer at a time: the worker, close() and explicit flush() calls
+        self.writing = threading.Lock()
+        self.thread = None
+        self.stopped = False
+        self.sequence = itertools.count()
+        self.spool_dir = Path(spool_dir) if spool_dir else None
+        self.spool = None
+        if self.spool_dir:
+            self.spool_dir.mkdir(parents=True, exist_ok=True)
+            self.spool_path = self.spool_dir / f"comments-{self.pid}.ndjson"
+
+    def put(self, comment):
+        """Queue `comment`; False when the queue is full and the caller should write it itself."""
+        with self.lock:
+            if len(self.pending) >= self.max_pending:
+                return False
+            if self.spool_dir:
+                if self.spool is None:
+                    self.spool = open(self.spool_path, "a", encoding="utf-8")
+                # Flushed to the OS (survives a crashed worker), not fsynced per request
+                self.spool.write(comment.dump())
+                self.spool.flush()
+            if not self.pending:
+                self.oldest = time.monotonic()
+            self.pending.append(comment)
+            # The worker waits for a first comment, then for a full batch or the deadline
+            if len(self.pending) in (1, self.batch_size):
+                self.ready.notify()
+        return True
+
+    def __len__(self):
+        with self.lock:
+            return len(self.pending)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="blog-comment-writer", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+        return self
+
+    def run(self):
+        try:
+            self.recover()
+        except Exception:
+            logger.exception("Recovering spooled comments failed")
+        while True:
+            with self.lock:
+                while not self.stopped:
+                    if len(self.pending) >= self.batch_size:
+                        break
+                    if self.pending:
+                        remaining = self.oldest + self.interval - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self.ready.wait(remaining)
+                    else:
+                        self.ready.wait()
+                if self.stopped:
+                    return
+            try:
+                self.flush()
+            except Exception:
+                # Keep the worker alive; the batch is logged by _write where possible
+                logger.exception("Writing queued comments failed")
+
+    def close(self):
+        """Stop the worker and write whatever is still queued."""
+        atexit.unregister(self.close)
+        with self.lock:
+            self.stopped = True
+            self.ready.notify()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.flush()
+
+    def flush(self):
+        """Write every queued comment now; returns how many were written."""
+        with self.writing:
+            with self.lock:
+                batch, self.pending = self.pending, []
+                claimed = self._rotate_spool() if batch else None
+            if not batch:
+                return 0
+            written = 0
+            for start in range(0, len(batch), self.batch_size):
+                written += self._write(batch[start:start + self.batch_size])
+            if claimed:
+                claimed.unlink(missing_ok=True)
+            return written
+
+    def _write(self, batch):
+        close_old_connections()
+        try:
+            return write_comments(batch)
+        except DatabaseError:
+            logger.exception("Batch of %d comments failed; writing them one by one", len(batch))
+        written = 0
+        for comment in batch:
+            try:
+                written += write_comments([comment])
+            except DatabaseError:
+                logger.exception("Dropped queued comment %s: %s", comment.id, comment.dump().strip())
+        return written
+
+    # Spool files
+
+    def _rotate_spool(self):
+        # Called with the lock held: set this batch's lines aside, new puts start a new file
+        if self.spool is None:
+            return None
+        self.spool.close()
+        self.spool = None
+        claimed = self.spool_dir / f"comments-{self.pid}.{next(self.sequence)}.writing"
+        os.replace(self.spool_path, claimed)
+        return claimed
+
+    def recover(self):
+        """Write the spooled comments of workers that exited before writing them."""
+        if not self.spool_dir:
+            return 0
+        written = 0
+        for path in sorted(self.spool_dir.glob("comments-*")):
+            try:
+                pid = int(path.name.split("-", 1)[1].split(".", 1)[0])
+            except ValueError:
+                continue
+            if pid == self.pid or _alive(pid):
+                continue
+            # The rename is the claim: if another worker got there first, it fails
+            claimed = self.spool_dir / f"comments-{self.pid}.{next(self.sequence)}.writing"
+            try:
+                os.replace(path, claimed)
+            except FileNotFoundError:
+                continue
+            with open(claimed, encoding="utf-8") as fh:
+                comments = [PendingComment.load(line) for line in fh if line.endswith("\n")]
+            comments = self._not_written(comments)
+            for start in range(0, len(comments), self.batch_size):
+                written += self._write(comments[start:start + self.batch_size])
+            claimed.unlink()
+            logger.info("Recovered %d spooled comments from %s", len(comments), path.name)
+        return written
+
+    @staticmethod
+    def _not_written(comments):
+        # A worker may die after its commit but before removing the file; the
+        # (user, post, created_at) triple identifies a comment it already wrote
+        close_old_connections()
+        written = set(
+            Comment.all_objects.filter(
+                user_id__in={c.user_id for c in comments}, created_at__in={c.created_at for c in comments},
+            ).values_list("user_id", "post_id", "created_at")
+        )
+        return [c for c in comments if (c.user_id, c.post_id, c.created_at) not in written]
+
+
+_queue = None
+_queue_pid = None
+_queue_lock = threading.Lock()
+
+
+def comment_queue():
+    global _queue, _queue_pid
+    # Like metrics.store(): a forked worker gets its own queue and thread
+    if _queue_pid != os.getpid():
+        with _queue_lock:
+            if _queue_pid != os.getpid():
+                _queue = CommentQueue(
+                    batch_size=settings.BLOG_COMMENT_BATCH_SIZE,
+                    interval=settings.BLOG_COMMENT_FLUSH_SECONDS,
+                    max_pending=settings.BLOG_COMMENT_QUEUE_MAX,
+                    spool_dir=settings.BLOG_COMMENT_SPOOL_DIR,
+                ).start()
+                _queue_pid = os.getpid()
+    return _queue
+
+
+def flush_comment_queue():
+    """Write this process's queued comments now (tests, benchmarks, shutdown hooks)."""
+    if _queue_pid != os.getpid():
+        return 0
+    return _queue.flush()
+
+
+def reset_comment_queue():
+    global _queue, _queue_pid
+    if _queue_pid == os.getpid():
+        _queue.close()
+    _queue, _queue_pid = None, None
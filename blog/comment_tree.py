@@ -0,0 +1,108 @@
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from .models import Comment
+from .pagination import DEFAULT_LIMIT, NEXT, arun_queries, encode_cursor, keyset_steps, run_queries
+from .serialization import format_datetime
+
+
+# Paged loading: a page of threads, each expanded a bounded number of levels
+# with a bounded number of replies per comment, so the response size no
+# longer grows with the discussion.
+DEFAULT_MAX_DEPTH = 2
+MAX_DEPTH = 5
+DEFAULT_REPLIES = 5
+MAX_REPLIES = 20
+# Stop expanding further levels once a page holds this many comments
+NODE_BUDGET = 500
+
+_PAGE_FIELDS = ('id', 'user__email', 'content', 'created_at')
+
+
+def _page_node(row):
+    # The values() row becomes the response node in place, with created_at
+    # pre-formatted for the encoder; cursors are taken from the raw value first
+    row["user"] = row.pop("user__email")
+    row["created_at"] = format_datetime(row["created_at"])
+    row["replies"] = []
+    row["more_replies"] = None
+    return row
+
+
+def _first_replies(post_id, parent_ids, per_parent):
+    # ROW_NUMBER per parent caps every sibling list in one query
+    rank = Window(RowNumber(), partition_by=F('parent_id'), order_by=(F('created_at').asc(), F('id').asc()))
+    return (
+        Comment.objects
+        .filter(post_id=post_id, parent_id__in=parent_ids)
+        .annotate(rank=rank)
+        .filter(rank__lte=per_parent)
+        .order_by('created_at', 'id')
+        .values(*_PAGE_FIELDS, 'parent_id')
+    )
+
+
+def comment_page_steps(post_id, parent_id=None, cursor=None, limit=DEFAULT_LIMIT,
+                       max_depth=DEFAULT_MAX_DEPTH, replies=DEFAULT_REPLIES, more_link=None):
+    """
+    One keyset page of a post's root comments (or of `parent_id`'s replies).
+
+    Each paged comment is expanded `max_depth` levels down, at most `replies`
+    children per comment; one query per level. Comments with replies that
+    were not included get `more_replies = more_link(comment_id, cursor)`,
+    where cursor continues after the last reply shown (None: from the start).
+    Returns (nodes, next_cursor, prev_cursor); raises CursorError.
+    """
+    siblings = Comment.objects.filter(post_id=post_id)
+    if parent_id is None:
+        siblings = siblings.filter(parent__isnull=True)
+    else:
+        siblings = siblings.filter(parent_id=parent_id)
+    rows, next_cursor, prev_cursor = yield from keyset_steps(
+        siblings.values(*_PAGE_FIELDS), cursor=cursor, limit=limit, descending=False,
+    )
+    more_link = more_link or (lambda pk, after: after)
+    nodes = [_page_node(row) for row in rows]
+    level = nodes
+    total = len(nodes)
+    for _ in range(max_depth):
+        if not level or total >= NODE_BUDGET:
+            break
+        by_id = {node["id"]: node for node in level}
+        last_shown = {}
+        next_level = []
+        for row in (yield _first_replies(post_id, list(by_id), replies + 1)):
+            parent = by_id[row.pop("parent_id")]
+            shown = parent["replies"]
+            if len(shown) == replies:
+                # The extra row only proves there is more
+                created_at, pk = last_shown[parent["id"]]
+                parent["more_replies"] = more_link(parent["id"], encode_cursor(created_at, pk, NEXT))
+                continue
+            last_shown[parent["id"]] = (row["created_at"], row["id"])
+            node = _page_node(row)
+            shown.append(node)
+            next_level.append(node)
+        total += len(next_level)
+        level = next_level
+
+    # The deepest loaded level was not expanded: flag the comments that have replies
+    if level:
+        with_replies = set((yield (
+            Comment.objects
+            .filter(post_id=post_id, parent_id__in=[node["id"] for node in level])
+            .values_list('parent_id', flat=True)
+            .distinct()
+        )))
+        for node in level:
+            if node["id"] in with_replies:
+                node["more_replies"] = more_link(node["id"], None)
+    return nodes, next_cursor, prev_cursor
+
+
+def comment_page(*args, **kwargs):
+    return run_queries(comment_page_steps(*args, **kwargs))
+
+
+async def acomment_page(*args, **kwargs):
+    return await arun_queries(comment_page_steps(*args, **kwargs))
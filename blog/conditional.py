@@ -0,0 +1,136 @@
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .cache import aglobal_version, global_version
+from .models import Post
+
+
+def _etag(*parts):
+    return quote_etag(hashlib.md5(":".join(str(p) for p in parts).encode()).hexdigest())
+
+
+def _list_query():
+    return Post.all_objects.order_by('-updated_at').values_list('updated_at', flat=True)
+
+
+def _list_result(request, last_modified, version):
+    if last_modified is None:
+        return None, None
+    return _etag(last_modified.isoformat(), version, request.GET.urlencode()), last_modified
+
+
+def post_list_validators(request):
+    # Any post write (including leaving the published set) moves the newest
+    # updated_at of the whole table. Hard deletes leave no row behind; they go
+    # through the admin, which bumps the global cache version instead.
+    return _list_result(request, _list_query().first(), global_version())
+
+
+async def apost_list_validators(request):
+    return _list_result(request, await _list_query().afirst(), await aglobal_version())
+
+
+def _detail_query(pk):
+    # One grouped query over the post row and all of its comments, trashed ones
+    # included, so soft deletes change the validators as well
+    return (
+        Post.all_objects.filter(pk=pk)
+        .values_list('updated_at', 'status', 'deleted_at')
+        .annotate(last_comment=Max('comments__updated_at'), comments=Count('comments'))
+        .order_by('pk')
+    )
+
+
+def _detail_result(row, version):
+    if row is None:
+        return None, None
+    updated_at, status, deleted_at, last_comment, comments = row
+    if status != "published" or deleted_at is not None:
+        return None, None
+    last_modified = max(updated_at, last_comment) if last_comment else updated_at
+    # The global version covers repairs that touch no timestamp (recount_posts)
+    return _etag(updated_at.isoformat(), last_comment, comments, version), last_modified
+
+
+def post_detail_validators(request, pk):
+    return _detail_result(_detail_query(pk).first(), global_version())
+
+
+async def apost_detail_validators(request, pk):
+    return _detail_result(await _detail_query(pk).afirst(), await aglobal_version())
+
+
+def _comments_result(request, etag, last_modified):
+    # Same inputs as the detail page, but each query string is its own representation
+    if etag is None:
+        return None, None
+    return _etag(etag, request.GET.urlencode()), last_modified
+
+
+def post_comments_validators(request, pk):
+    return _comments_result(request, *post_detail_validators(request, pk))
+
+
+async def apost_comments_validators(request, pk):
+    return _comments_result(request, *await apost_detail_validators(request, pk))
+
+
+def conditional_response(validators):
+    """
+    Answer If-None-Match / If-Modified-Since with 304 before the view runs.
+
+    `validators(request, *args, **kwargs)` returns (etag, last_modified); when
+    both are None the view is called unconditionally (e.g. to produce a 404).
+    The ETag is left on request.blog_etag for @cache_response to key on.
+    """
+
+    def precondition(request, etag, last_modified):
+        # (304/412 response or None, Last-Modified as a timestamp)
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        return get_conditional_response(request, etag=etag, last_modified=timestamp), timestamp
+
+    def stamp(response, etag, timestamp):
+        if response.status_code in (200, 304):
+            if etag and not response.has_header("ETag"):
+                response.headers["ETag"] = etag
+            if timestamp is not None and not response.has_header("Last-Modified"):
+                response.headers["Last-Modified"] = http_date(timestamp)
+        return response
+
+    def decorator(view):
+        # Async views take async validators (a coroutine function with the same signature)
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if request.method not in ("GET", "HEAD"):
+                    return await view(request, *args, **kwargs)
+                etag, last_modified = await validators(request, *args, **kwargs)
+                if etag is None and last_modified is None:
+                    return await view(request, *args, **kwargs)
+                response, timestamp = precondition(request, etag, last_modified)
+                if response is None:
+                    request.blog_etag = etag
+                    response = await view(request, *args, **kwargs)
+                return stamp(response, etag, timestamp)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+            etag, last_modified = validators(request, *args, **kwargs)
+            if etag is None and last_modified is None:
+                return view(request, *args, **kwargs)
+            response, timestamp = precondition(request, etag, last_modified)
+            if response is None:
+                request.blog_etag = etag
+                response = view(request, *args, **kwargs)
+            return stamp(response, etag, timestamp)
+        return wrapper
+    return decorator
@@ -0,0 +1,87 @@
+import json
+
+from django.contrib.auth import get_user_model
+
+from .models import Comment, Post
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder produces the same lines, slower
+    orjson = None
+
+CONTENT_TYPE = "application/x-ndjson"
+DEFAULT_CHUNK_SIZE = 2000
+# Lines are joined into buffers of about this size before being written
+WRITE_BUFFER = 64 * 1024
+
+USER_FIELDS = ('id', 'email', 'name', 'is_author', 'is_active', 'created_at')
+POST_FIELDS = ('id', 'author__email', 'title', 'content', 'status', 'created_at', 'updated_at', 'deleted_at')
+COMMENT_FIELDS = ('id', 'post_id', 'parent_id', 'user__email', 'content', 'depth', 'created_at', 'deleted_at')
+
+
+def _default(value):
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    def encode(record):
+        return orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE)
+else:
+    def encode(record):
+        return (json.dumps(record, default=_default, separators=(",", ":")) + "\n").encode()
+
+
+def _typed(kind, rows, renames):
+    for row in rows:
+        for old, new in renames:
+            row[new] = row.pop(old)
+        row["type"] = kind
+        yield row
+
+
+def export_records(include_deleted=False, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield the corpus as flat typed dicts: every user, then each post followed by
+    its comments in thread order (parents before replies, via Comment.path).
+
+    Posts and comments are two ordered .iterator() streams merged on post id,
+    so memory stays at one chunk of each regardless of corpus size.
+    """
+    users = get_user_model().objects.order_by('id').values(*USER_FIELDS)
+    yield from _typed("user", users.iterator(chunk_size=chunk_size), ())
+
+    posts = (Post.all_objects if include_deleted else Post.objects).order_by('id')
+    comments = Comment.all_objects if include_deleted else Comment.objects.filter(post__deleted_at__isnull=True)
+    posts = _typed("post", posts.values(*POST_FIELDS).iterator(chunk_size=chunk_size), [('author__email', 'author')])
+    comments = _typed(
+        "comment",
+        comments.order_by('post_id', 'path').values(*COMMENT_FIELDS).iterator(chunk_size=chunk_size),
+        [('user__email', 'user')],
+    )
+
+    comment = next(comments, None)
+    for post in posts:
+        yield post
+        # Both streams are ordered by post id; skip comments of posts not exported
+        while comment is not None and comment["post_id"] <= post["id"]:
+            if comment["post_id"] == post["id"]:
+                yield comment
+            comment = next(comments, None)
+
+
+def ndjson_chunks(records, buffer_size=WRITE_BUFFER):
+    """Encode records one per line, yielding bytes buffers of about `buffer_size`."""
+    lines = []
+    size = 0
+    for record in records:
+        line = encode(record)
+        lines.append(line)
+        size += len(line)
+        if size >= buffer_size:
+            yield b"".join(lines)
+            lines = []
+            size = 0
+    if lines:
+        yield b"".join(lines)
@@ -0,0 +1,318 @@
+import json
+import os
+import time
+from datetime import timezone as dt_timezone
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .cache import bump_global_version
+from .comment_paths import backfill_paths
+from .models import Comment, Post
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+DEFAULT_BATCH_SIZE = 2000
+_loads = orjson.loads if orjson is not None else json.loads
+
+
+class ImportFormatError(ValueError):
+    def __init__(self, line, message):
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+
+
+def _when(value, line):
+    if value in (None, ""):
+        return None
+    parsed = parse_datetime(value) if isinstance(value, str) else None
+    if parsed is None:
+        raise ImportFormatError(line, f"invalid datetime {value!r}")
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed, dt_timezone.utc)
+
+
+class BlogImporter:
+    """
+    Load NDJSON records (the export_blog format) with bulk_create.
+
+    Source ids are remapped: users by email, posts and comments through
+    in-memory old -> new id maps. Replies are linked on insert when their
+    parent came first (always, for export_blog output); the rest are
+    re-linked once every comment has a new id (two passes), so input order
+    does not matter. Each batch is one transaction and is recorded in an
+    append-only state log, which a rerun replays to resume after the last
+    committed batch.
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, state_path=None, progress=None):
+        self.batch_size = max(1, batch_size)
+        self.state_path = state_path
+        self.progress = progress or (lambda line, rows, rate: None)
+        User = get_user_model()
+        self.User = User
+        self.users = dict(User.objects.values_list('email', 'id'))
+        self.posts = {}
+        # old comment id -> (new id, old parent id)
+        self.comments = {}
+        self.created_users = 0
+        self.orphans = 0
+        self.resume_after = 0
+        self._unusable = make_password(None)
+        self._reset_batch()
+
+    # State log
+
+    def load_state(self):
+        """Replay the state log; returns the last input line already imported."""
+        if not self.state_path or not os.path.exists(self.state_path):
+            return 0
+        entries = []
+        with open(self.state_path, "rb") as fh:
+            for raw in fh:
+                try:
+                    entries.append(_loads(raw))
+                except ValueError:
+                    break  # torn final write: that batch is checked below
+        # The last entry is written just before its transaction commits
+        if entries and not self._committed(entries[-1]):
+            entries.pop()
+        for entry in entries:
+            self.users.update(entry["users"])
+            self.posts.update((old, new) for old, new in entry["posts"])
+            self.comments.update((old, (new, parent)) for old, new, parent in entry["comments"])
+            self.created_users += len(entry["users"])
+            self.resume_after = entry["line"]
+        return self.resume_after
+
+    def _committed(self, entry):
+        # A batch commits all of its rows or none, so checking one is enough
+        if entry["comments"]:
+            return Comment.all_objects.filter(pk=entry["comments"][-1][1]).exists()
+        if entry["posts"]:
+            return Post.all_objects.filter(pk=entry["posts"][-1][1]).exists()
+        if entry["users"]:
+            return self.User.objects.filter(email=next(iter(entry["users"]))).exists()
+        return True
+
+    def _log(self, line):
+        if not self.state_path:
+            return
+        entry = {
+            "line": line,
+            "users": {u.email: u.pk for u in self._users},
+            "posts": [[old, post.pk] for old, post in self._posts],
+            "comments": [[old, *self.comments[old]] for old, _, _ in self._comments],
+        }
+        with open(self.state_path, "ab") as fh:
+            fh.write((json.dumps(entry, separators=(",", ":")) + "\n").encode())
+            fh.flush()
+            os.fsync(fh.fileno())
+
+    # Pass 1: rows
+
+    def _reset_batch(self):
+        self._users = []
+        self._posts = []
+        self._comments = []
+        self._pending_emails = {}
+        self._batch_posts = set()
+
+    def _user_id(self, email, line):
+        # Returns an id, or the unsaved user queued in this batch
+        if not email:
+            raise ImportFormatError(line, "missing user email")
+        if email in self.users:
+            return self.users[email]
+        if email not in self._pending_emails:
+            self._add_user({"email": email, "name": email.split("@")[0]}, line)
+        return self._pending_emails[email]
+
+    def _add_user(self, record, line):
+        email = record.get("email")
+        if not email:
+            raise ImportFormatError(line, "missing user email")
+        if email in self.users or email in self._pending_emails:
+            return
+        user = self.User(
+            email=email,
+            name=record.get("name") or email.split("@")[0],
+            password=self._unusable,
+            is_author=bool(record.get("is_author")),
+            is_active=record.get("is_active", True),
+            created_by=email,
+            updated_by=email,
+        )
+        created_at = _when(record.get("created_at"), line)
+        if created_at:
+            user.created_at = created_at
+        self._users.append(user)
+        self._pending_emails[email] = user
+
+    def _add_post(self, record, line):
+        old = record.get("id")
+        if old is None or old in self.posts or old in self._batch_posts:
+            raise ImportFormatError(line, f"missing or duplicate post id {old!r}")
+        author = self._user_id(record.get("author"), line)
+        post = Post(
+            title=record.get("title") or "",
+            content=record.get("content") or "",
+            status=record.get("status") or "draft",
+            deleted_at=_when(record.get("deleted_at"), line),
+            created_by=record.get("author"),
+            updated_by=record.get("author"),
+        )
+        post._author = author
+        created_at = _when(record.get("created_at"), line)
+        if created_at:
+            post.created_at = created_at
+        self._posts.append((old, post))
+        self._batch_posts.add(old)
+
+    def _add_comment(self, record, line):
+        old = record.get("id")
+        if old is None or old in self.comments:
+            raise ImportFormatError(line, f"missing or duplicate comment id {old!r}")
+        post_id = record.get("post_id")
+        if post_id not in self.posts and post_id not in self._batch_posts:
+            raise ImportFormatError(line, f"comment {old} refers to unknown post {post_id!r}")
+        comment = Comment(
+            content=record.get("content") or "",
+            deleted_at=_when(record.get("deleted_at"), line),
+            created_by=record.get("user"),
+            updated_by=record.get("user"),
+        )
+        comment._user = self._user_id(record.get("user"), line)
+        comment._post = post_id
+        created_at = _when(record.get("created_at"), line)
+        if created_at:
+            comment.created_at = created_at
+        self._comments.append((old, comment, record.get("parent_id")))
+        # Reserve the id so duplicates inside one batch are caught too
+        self.comments[old] = None
+
+    def _resolve(self, user):
+        # Users queued in the same batch only get their id from bulk_create
+        return user.pk if isinstance(user, self.User) else user
+
+    def _flush(self, line):
+        if not (self._users or self._posts or self._comments):
+            return 0
+        with transaction.atomic():
+            self.User.objects.bulk_create(self._users, batch_size=self.batch_size)
+            for user in self._users:
+                self.users[user.email] = user.pk
+            for _, post in self._posts:
+                post.author_id = self._resolve(post._author)
+            Post.all_objects.bulk_create([post for _, post in self._posts], batch_size=self.batch_size)
+            for old, post in self._posts:
+                self.posts[old] = post.pk
+            for _, comment, _ in self._comments:
+                comment.user_id = self._resolve(comment._user)
+                comment.post_id = self.posts[comment._post]
+            self._insert_comments()
+            self._log(line)
+        self.created_users += len(self._users)
+        rows = len(self._users) + len(self._posts) + len(self._comments)
+        self._reset_batch()
+        return rows
+
+    def _insert_comments(self):
+        """
+        bulk_create the batch's comments in waves so replies can be linked as
+        they are inserted: each wave holds the comments whose parent already
+        has a new id. Parents not seen yet (forward references, or missing
+        from the input) are left for link_parents().
+        """
+        pending = self._comments
+        while pending:
+            waiting_ids = {old for old, _, _ in pending}
+            ready, waiting = [], []
+            for entry in pending:
+                old, comment, parent = entry
+                if parent is None:
+                    ready.append(entry)
+                elif parent in waiting_ids and parent != old:
+                    waiting.append(entry)
+                else:
+                    known = self.comments.get(parent)
+                    if known is not None:
+                        comment.parent_id = known[0]
+                    ready.append(entry)
+            if not ready:
+                # Only a parent cycle is left; insert unlinked and let the second pass decide
+                ready, waiting = waiting, []
+            Comment.all_objects.bulk_create([c for _, c, _ in ready], batch_size=self.batch_size)
+            for old, comment, parent in ready:
+                # None once linked: the second pass only visits the rest
+                self.comments[old] = (comment.pk, parent if comment.parent_id is None else None)
+            pending = waiting
+
+    def load(self, lines, start_line=1):
+        """Pass 1: insert the records of `lines`, numbered from `start_line`."""
+        handlers = {"user": self._add_user, "post": self._add_post, "comment": self._add_comment}
+        started = last_report = time.perf_counter()
+        rows = buffered = 0
+        number = start_line - 1
+        for number, raw in enumerate(lines, start_line):
+            if number <= self.resume_after or not raw.strip():
+                continue
+            try:
+                record = _loads(raw)
+                handler = handlers[record.get("type")]
+            except (ValueError, KeyError, AttributeError):
+                raise ImportFormatError(number, "not a user/post/comment record")
+            handler(record, number)
+            buffered += 1
+            if buffered >= self.batch_size:
+                rows += self._flush(number)
+                buffered = 0
+                if time.perf_counter() - last_report >= 1:
+                    last_report = time.perf_counter()
+                    self.progress(number, rows, rows / (last_report - started))
+        rows += self._flush(number)
+        self.progress(number, rows, rows / max(time.perf_counter() - started, 1e-9))
+        return rows
+
+    # Pass 2: parents, paths, counters
+
+    def link_parents(self):
+        pending = []
+        linked = 0
+        for old, (new_id, old_parent) in self.comments.items():
+            if old_parent is None:
+                continue
+            parent = self.comments.get(old_parent)
+            if parent is None or old_parent == old:
+                # Parent not in the input (e.g. a live-only export dropped it): keep as a root
+                self.orphans += 1
+                continue
+            pending.append(Comment(id=new_id, parent_id=parent[0]))
+            if len(pending) >= self.batch_size:
+                linked += self._link(pending)
+                pending = []
+        if pending:
+            linked += self._link(pending)
+        return linked
+
+    def _link(self, comments):
+        with transaction.atomic():
+            Comment.all_objects.bulk_update(comments, ['parent'], batch_size=self.batch_size)
+        return len(comments)
+
+    def finish(self):
+        """Pass 2 over everything imported so far; safe to rerun."""
+        linked = self.link_parents()
+        if self.posts:
+            lo, hi = min(self.posts.values()), max(self.posts.values())
+            with transaction.atomic():
+                backfill_paths(Comment.all_objects.filter(post_id__gte=lo, post_id__lte=hi))
+                Post.all_objects.filter(pk__gte=lo, pk__lte=hi).refresh_comment_stats()
+        # Imported rows keep their exported timestamps, which may not move the list ETag
+        bump_global_version()
+        return linked
@@ -0,0 +1,126 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from django.conf import settings
+
+from . import metrics
+
+logger = logging.getLogger("blog.requests")
+
+# Stats of the request being served in this context; ORM calls made through
+# sync_to_async run in a copy of the context, so async views are covered too
+_current = ContextVar("blog_request_stats", default=None)
+
+_PLACEHOLDER_LIST = re.compile(r"%s(?:\s*,\s*%s)+")
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def fingerprint(sql):
+    """SQL shape without literals, with IN (...) lists collapsed: N+1 loops share one."""
+    return _LITERAL.sub("?", _PLACEHOLDER_LIST.sub("%s, ...", sql))
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        # Set by the middleware's process_view; None when no view ran (e.g. 404)
+        self.view_started = None
+        self.db_time = 0.0
+        self.queries = 0
+        self.statements = Counter()
+
+    def record(self, sql, elapsed):
+        self.queries += 1
+        self.db_time += elapsed
+        self.statements[sql] += 1
+
+    def duplicates(self):
+        """{fingerprint: executions} for every query shape run more than once."""
+        shapes = Counter()
+        for sql, count in self.statements.items():
+            shapes[fingerprint(sql)] += count
+        return {shape: count for shape, count in shapes.items() if count > 1}
+
+
+def record_queries(execute, sql, params, many, context):
+    # Installed on every connection; a no-op outside an instrumented request
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.record(sql, time.perf_counter() - started)
+
+
+def install(sender, connection, **kwargs):
+    """connection_created receiver: wrap the new connection's queries."""
+    if record_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_queries)
+
+
+def start_request():
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def finish_request(request, response, stats, token):
+    """Report the request: Server-Timing header, metrics, log line, query budget."""
+    _current.reset(token)
+    now = time.perf_counter()
+    total = now - stats.started
+    view_time = now - stats.view_started if stats.view_started else 0.0
+    duplicates = stats.duplicates()
+    match = getattr(request, "resolver_match", None)
+    view = match.url_name if match else None
+
+    if getattr(settings, "BLOG_SERVER_TIMING", False):
+        response.headers["Server-Timing"] = ", ".join((
+            f'db;dur={stats.db_time * 1000:.2f};desc="{stats.queries} queries"',
+            f'dup;desc="{sum(duplicates.values()) - len(duplicates)} duplicate queries"',
+            f"view;dur={view_time * 1000:.2f}",
+            f"total;dur={total * 1000:.2f}",
+        ))
+
+    if getattr(settings, "BLOG_METRICS", True):
+        metrics.observe_request(
+            view, request.method, response.status_code, total, stats.queries, stats.db_time,
+            getattr(request, "blog_cache", None),
+        )
+
+    fields = {
+        "method": request.method,
+        "path": request.path,
+        "view": view,
+        "status": response.status_code,
+        "queries": stats.queries,
+        "db_ms": round(stats.db_time * 1000, 2),
+        "view_ms": round(view_time * 1000, 2),
+        "total_ms": round(total * 1000, 2),
+        "duplicates": duplicates,
+    }
+    budget = getattr(settings, "BLOG_QUERY_BUDGETS", {}).get(view)
+    over = budget is not None and stats.queries > budget
+    if over or logger.isEnabledFor(logging.INFO):
+        line = " ".join(f"{key}={value}" for key, value in fields.items() if key != "duplicates")
+        if duplicates:
+            line += f" duplicates={len(duplicates)}"
+        if over:
+            logger.warning("%s budget=%s over query budget", line, budget, extra={"request_stats": fields})
+        else:
+            logger.info(line, extra={"request_stats": fields})
+    if over and getattr(settings, "BLOG_QUERY_BUDGET_ENFORCE", False):
+        shapes = "\n".join(f"  {count}x {shape}" for shape, count in duplicates.items())
+        raise QueryBudgetExceeded(
+            f"{view} ran {stats.queries} queries, budget is {budget}"
+            + (f"; repeated:\n{shapes}" if shapes else "")
+        )
+    return response
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.comment_paths import backfill_paths
+from blog.models import Comment
+
+
+class Command(BaseCommand):
+    help = "Recompute Comment.path / depth (materialized thread paths) for all or some posts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--post", type=int, action="append", dest="posts", help="Only this post id (repeatable)")
+
+    def handle(self, *args, **options):
+        comments = Comment.all_objects.all()
+        if options["posts"]:
+            comments = comments.filter(post_id__in=options["posts"])
+
+        def progress(depth, rows, rate):
+            self.stdout.write(f"  depth {depth}: {rows:,} rows ({rate:,.0f} rows/s overall)")
+
+        started = time.perf_counter()
+        with transaction.atomic():
+            total = backfill_paths(comments, progress=progress)
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        self.stdout.write(self.style.SUCCESS(
+            f"Backfilled paths for {total:,} comments in {elapsed:.1f}s ({total / elapsed:,.0f} rows/s)."
+        ))
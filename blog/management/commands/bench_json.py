@@ -0,0 +1,84 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.http import JsonResponse
+from django.utils import timezone
+
+from blog.comment_tree import _page_node
+from blog.serialization import orjson, serializer
+
+WIDTHS = (3, 2)  # replies per root, per reply: 1 + 3 + 6 comments per thread
+
+
+def _legacy_node(row):
+    # The pre-serializer node: a copy of the values() row, datetime left to DjangoJSONEncoder
+    return {
+        "id": row["id"],
+        "user": row["user__email"],
+        "content": row["content"],
+        "created_at": row["created_at"],
+        "replies": [],
+        "more_replies": None,
+    }
+
+
+class Command(BaseCommand):
+    help = "Microbenchmark building and encoding a comment tree (JsonResponse vs the pluggable serializers)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--comments", type=int, default=10000)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        threads = max(1, options["comments"] // 10)
+        rng = random.Random(1)
+        now = timezone.now()
+        # values() rows as the comment page queries return them
+        rows = []
+        for pk in range(threads * 10):
+            rows.append({
+                "id": pk + 1,
+                "user__email": f"user{rng.randrange(1000)}@example.com",
+                "content": " ".join(rng.choices(("lorem", "ipsum", "dolor", "sit", "amet"), k=rng.randint(5, 40))),
+                "created_at": now - timedelta(microseconds=rng.randrange(10**12)),
+            })
+
+        candidates = [("JsonResponse", _legacy_node, lambda data: JsonResponse(data).content)]
+        candidates.append(("stdlib", _page_node, serializer("stdlib")))
+        if orjson is not None:
+            candidates.append(("orjson", _page_node, serializer("orjson")))
+
+        self.stdout.write(f"{len(rows):,} comments, best of {options['repeat']} runs")
+        baseline = None
+        for label, make_node, dumps in candidates:
+            best_build = best_encode = float("inf")
+            for _ in range(options["repeat"]):
+                fresh = [dict(row) for row in rows]  # _page_node consumes its rows
+                started = time.perf_counter()
+                data = {"comments": self.tree(fresh, make_node)}
+                built = time.perf_counter()
+                body = dumps(data)
+                encoded = time.perf_counter()
+                best_build = min(best_build, built - started)
+                best_encode = min(best_encode, encoded - built)
+            total = best_build + best_encode
+            baseline = baseline or total
+            self.stdout.write(
+                f"{label:<13} build {best_build * 1000:6.1f} ms  encode {best_encode * 1000:6.1f} ms  "
+                f"total {total * 1000:6.1f} ms  {len(body) / 1024:7.0f} KiB  x{baseline / total:.1f}"
+            )
+
+    def tree(self, rows, make_node):
+        rows = iter(rows)
+        roots = []
+        for row in rows:
+            root = make_node(row)
+            roots.append(root)
+            for _ in range(WIDTHS[0]):
+                child = make_node(next(rows))
+                root["replies"].append(child)
+                for _ in range(WIDTHS[1]):
+                    child["replies"].append(make_node(next(rows)))
+        return roots
@@ -0,0 +1,93 @@
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from blog.models import Post
+from blog.pagination import encode_cursor
+from blog.views import post_list_api
+
+BENCH_MARKER = "bench@system.local"
+
+
+class Command(BaseCommand):
+    help = "Compare first-page and deep-page latency of post_list_api (keyset vs OFFSET)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, default=1_000_000, help="Published posts to ensure exist")
+        parser.add_argument("--limit", type=int, default=20)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--cleanup", action="store_true", help="Delete benchmark posts afterwards")
+
+    def handle(self, *args, **options):
+        limit = options["limit"]
+        total = self._seed(options["posts"], options["batch_size"])
+        deep_offset = max(total - limit, 0)
+        published = Post.objects.filter(status="published")
+        anchor = published.order_by('-created_at', '-id').values('created_at', 'id')[deep_offset - 1] if deep_offset else None
+
+        factory = RequestFactory(HTTP_HOST="localhost")
+        first = factory.get("/posts/", {"limit": limit})
+        deep_params = {"limit": limit}
+        if anchor:
+            deep_params["cursor"] = encode_cursor(anchor['created_at'], anchor['id'])
+        deep = factory.get("/posts/", deep_params)
+
+        fields = ('id', 'title', 'author__email', 'status', 'created_at')
+        # Every run must render: cached bodies would time a cache hit, not the query
+        with override_settings(BLOG_CACHE_TIMEOUT=0):
+            results = {
+                "keyset first page": self._time(lambda: post_list_api(first), options["repeat"]),
+                "keyset deep page": self._time(lambda: post_list_api(deep), options["repeat"]),
+                "offset deep page": self._time(
+                    lambda: list(published.order_by('-created_at', '-id').values(*fields)[deep_offset:deep_offset + limit]),
+                    options["repeat"],
+                ),
+            }
+        self.stdout.write(f"{total} published posts, limit={limit}, deep offset={deep_offset}")
+        for label, (best, median) in results.items():
+            self.stdout.write(f"  {label:<18} best {best * 1000:8.2f} ms | median {median * 1000:8.2f} ms")
+
+        if options["cleanup"]:
+            deleted, _ = Post.all_objects.filter(created_by=BENCH_MARKER).delete()
+            self.stdout.write(self.style.WARNING(f"Removed {deleted} benchmark rows."))
+
+    def _seed(self, target, batch_size):
+        existing = Post.objects.filter(status="published").count()
+        missing = target - existing
+        if missing <= 0:
+            return existing
+        User = get_user_model()
+        author, _ = User.objects.get_or_create(email=BENCH_MARKER, defaults={"name": "Bench", "is_author": True})
+        start = timezone.now() - timedelta(seconds=missing)
+        self.stdout.write(f"Seeding {missing} published posts...")
+        for offset in range(0, missing, batch_size):
+            with transaction.atomic():
+                Post.objects.bulk_create([
+                    Post(
+                        author=author,
+                        title=f"Bench post {i}",
+                        content="Benchmark body.",
+                        status="published",
+                        created_at=start + timedelta(seconds=i),
+                        created_by=BENCH_MARKER,
+                        updated_by=BENCH_MARKER,
+                    )
+                    for i in range(offset, min(offset + batch_size, missing))
+                ])
+        return target
+
+    def _time(self, fn, repeat):
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - started)
+        samples.sort()
+        return samples[0], samples[len(samples) // 2]
@@ -0,0 +1,98 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from blog.management.commands.seed_data import WORDS
+from blog.models import Post
+from blog.search import LikeSearch, search_backend, search_terms
+
+BENCH_MARKER = "bench@system.local"
+# ~4k compound words drawn with Zipf weights: a few very common terms, a long rare tail
+VOCABULARY = [a + b for a in WORDS for b in WORDS]
+WEIGHTS = [1 / (rank + 1) for rank in range(len(VOCABULARY))]
+DEFAULT_QUERIES = [VOCABULARY[0], f"{VOCABULARY[20]} {VOCABULARY[60]}", VOCABULARY[500], VOCABULARY[3000]]
+
+
+class Command(BaseCommand):
+    help = "Compare full-text index search with the LIKE '%term%' path (admin search and API)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, default=200_000, help="Posts to ensure exist")
+        parser.add_argument("--query", action="append", dest="queries", help="Query to time (repeatable)")
+        parser.add_argument("--limit", type=int, default=20)
+        parser.add_argument("--repeat", type=int, default=10)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--cleanup", action="store_true", help="Delete benchmark posts afterwards")
+
+    def handle(self, *args, **options):
+        backend = search_backend()
+        if not backend.indexed:
+            raise CommandError("This database has no full-text index; only the LIKE path is available.")
+        total = self._seed(options["posts"], options["batch_size"])
+        queries = options["queries"] or DEFAULT_QUERIES
+        like = LikeSearch()
+        limit, repeat = options["limit"], options["repeat"]
+        posts = Post.all_objects.all()
+
+        self.stdout.write(f"{total} posts, {type(backend).__name__}, limit={limit}")
+        for query in queries:
+            terms = search_terms(query)
+            matches = backend.filter(posts, terms).count()
+            results = {
+                # Admin changelist: count + first page in id order
+                "admin LIKE": lambda: (like.filter(posts, terms).count(), list(like.filter(posts, terms).order_by('-id')[:limit])),
+                "admin index": lambda: (backend.filter(posts, terms).count(), list(backend.filter(posts, terms).order_by('-id')[:limit])),
+                "api ranked": lambda: backend.ranked(terms, limit=limit + 1),
+            }
+            self.stdout.write(f"  {query!r}: {matches} matches")
+            for label, fn in results.items():
+                best, median = self._time(fn, repeat)
+                self.stdout.write(f"    {label:<12} best {best * 1000:8.2f} ms | median {median * 1000:8.2f} ms")
+
+        if options["cleanup"]:
+            deleted, _ = Post.all_objects.filter(created_by=BENCH_MARKER).delete()
+            self.stdout.write(self.style.WARNING(f"Removed {deleted} benchmark rows."))
+
+    def _seed(self, target, batch_size):
+        existing = Post.all_objects.count()
+        missing = target - existing
+        if missing <= 0:
+            return existing
+        rng = random.Random(7)
+        cumulative = []
+        running = 0.0
+        for weight in WEIGHTS:
+            running += weight
+            cumulative.append(running)
+
+        def words(k):
+            return " ".join(rng.choices(VOCABULARY, cum_weights=cumulative, k=k))
+        User = get_user_model()
+        author, _ = User.objects.get_or_create(email=BENCH_MARKER, defaults={"name": "Bench", "is_author": True})
+        self.stdout.write(f"Seeding {missing} posts...")
+        for offset in range(0, missing, batch_size):
+            with transaction.atomic():
+                Post.objects.bulk_create([
+                    Post(
+                        author=author,
+                        title=words(6).capitalize(),
+                        content=words(rng.randint(40, 160)),
+                        status="published",
+                        created_by=BENCH_MARKER,
+                        updated_by=BENCH_MARKER,
+                    )
+                    for _ in range(offset, min(offset + batch_size, missing))
+                ])
+        return target
+
+    def _time(self, fn, repeat):
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - started)
+        samples.sort()
+        return samples[0], samples[len(samples) // 2]
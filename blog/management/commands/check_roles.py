@@ -9,8 +9,10 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         User = get_user_model()
         users = User.objects.all()
-        posts = Post.objects.all()
-        if not posts.exists():
+        # One query for every (post, author) pair instead of re-reading the posts
+        # (and each post's author) for every user
+        posts = list(Post.objects.order_by('pk').values_list('id', 'author_id'))
+        if not posts:
             self.stdout.write(self.style.WARNING("No posts found. Run create_author_posts first."))
             return
 
@@ -20,12 +22,12 @@ class Command(BaseCommand):
                 "author" if user.is_author and user.is_staff else
                 "user"
             )
-            own_ids = set(posts.filter(author=user).values_list('id', flat=True))
+            own_ids = {pk for pk, author_id in posts if author_id == user.id}
             can_add = (user.is_superuser or (user.is_author and user.is_staff))
             can_publish = can_add  # limited further by ownership in admin code
             can_soft_delete = can_add
-            editable = [p.id for p in posts if p.author == user and can_add]
-            read_only = [p.id for p in posts if p.author != user]
+            editable = [pk for pk, author_id in posts if author_id == user.id and can_add]
+            read_only = [pk for pk, author_id in posts if author_id != user.id]
             self.stdout.write(f"User: {user.email} | Role: {role}")
             self.stdout.write(f"  Own posts: {sorted(list(own_ids))}")
             self.stdout.write(f"  Editable post IDs: {editable}")
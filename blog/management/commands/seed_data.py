@@ -1,126 +1,206 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.admin.models import LogEntry
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
 from django.core.management.base import BaseCommand
+from django.core.management.color import no_style
+from django.db import connection, transaction
 from django.utils import timezone
-from django.contrib.auth import get_user_model
-import random
 
-from blog.models import Post, Comment  # UPDATE appname
+from blog.models import Post, Comment, path_segment
 
 
-try:
-    from faker import Faker
-    fake = Faker()
-    USE_FAKER = True
-except Exception:
-    fake = None
-    USE_FAKER = False
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+    "incididunt ut labore et dolore magna aliqua enim ad minim veniam quis nostrud "
+    "exercitation ullamco laboris nisi aliquip ex ea commodo consequat duis aute irure "
+    "in reprehenderit voluptate velit esse cillum fugiat nulla pariatur excepteur sint "
+    "occaecat cupidatat non proident sunt culpa qui officia deserunt mollit anim id est"
+).split()
+
+BASE_NAMES = ["Alice", "Bob", "Carol", "Dave", "Erin"]
+SEED_EMAIL = "seed@system.local"
 
 
 class Command(BaseCommand):
-    help = "Seed database with Users (5), Posts (10), Comments (30)"
+    help = "Wipe and seed Users, Posts and nested Comments in bulk (defaults: 5 / 10 / 30)"
 
-    def handle(self, *args, **kwargs):
-        self.stdout.write(self.style.WARNING("Deleting old data..."))
-        Comment.objects.all().delete()
-        Post.objects.all().delete()
-        User = get_user_model()
-        User.objects.all().delete()
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=5)
+        parser.add_argument("--posts", type=int, default=10)
+        parser.add_argument("--comments", type=int, default=30)
+        parser.add_argument("--depth", type=int, default=2, help="Maximum reply depth (0 = root comments only)")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows per bulk_create / transaction")
+        parser.add_argument("--seed", type=int, default=42, help="Random seed; the same seed gives the same data")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.batch_size = max(1, options["batch_size"])
+        self.now = timezone.now()
 
+        self.stdout.write(self.style.WARNING("Deleting old data..."))
+        self.wipe()
         self.stdout.write(self.style.SUCCESS("Old data removed."))
 
-        # ============================================
-        # CREATE USERS (5)
-        # ============================================
-        users = []
-        base_emails = [
-            "alice@example.com",
-            "bob@example.com",
-            "carol@example.com",
-            "dave@example.com",
-            "erin@example.com",
-        ]
-        for i in range(5):
-            if USE_FAKER:
-                name = fake.name()
-                email = fake.unique.email()
-                mobile = str(fake.random_number(digits=10))
-                is_author = fake.boolean()
-                created_by = fake.email()
-                updated_by = fake.email()
-            else:
-                name = ["Alice", "Bob", "Carol", "Dave", "Erin"][i]
-                email = base_emails[i]
-                mobile = f"90000000{i}"
-                is_author = True if i % 2 == 0 else False
-                created_by = "seed@system.local"
-                updated_by = "seed@system.local"
-
-            user = User.objects.create_user(
-                email=email,
-                password="password123",
-                name=name,
-                is_author=is_author,
-                mobile=mobile,
-                created_at=timezone.now(),
-                updated_at=timezone.now(),
-                deleted_at=None,
-                created_by=created_by,
-                updated_by=updated_by,
-            )
-            users.append(user)
+        started = time.perf_counter()
+        users = self.seed_users(max(1, options["users"]))
+        posts = self.seed_posts(max(1, options["posts"]), users)
+        total = self.seed_comments(options["comments"], max(0, options["depth"]), posts, users)
+        with transaction.atomic():
+            Post.all_objects.refresh_comment_stats()
 
-        self.stdout.write(self.style.SUCCESS("5 Users created."))
+        elapsed = time.perf_counter() - started
+        rows = len(users) + len(posts) + total
+        self.stdout.write(self.style.SUCCESS(
+            f"Database seeding completed: {rows} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)."
+        ))
 
-        # ============================================
-        # CREATE POSTS (10)
-        # ============================================
-        posts = []
-        statuses = ["draft", "published", "archived"]
+    # Helpers
 
-        for i in range(10):
-            author = random.choice(users)
-            if USE_FAKER:
-                title = fake.sentence()
-                content = fake.paragraph(nb_sentences=8)
-            else:
-                title = f"Sample Post {i+1}"
-                content = "This is a sample post body used for seeding without Faker."
-
-            post = Post.objects.create(
-                author=author,
-                title=title,
-                content=content,
-                status=random.choice(statuses),
-                created_at=timezone.now(),
-                updated_at=timezone.now(),
-                deleted_at=None,
-                created_by=author.email,
-                updated_by=author.email,
-            )
-            posts.append(post)
-
-        self.stdout.write(self.style.SUCCESS("10 Posts created."))
-
-        # ============================================
-        # CREATE COMMENTS (30)
-        # ============================================
-        for i in range(30):
-            post = random.choice(posts)
-            user = random.choice(users)
-            if USE_FAKER:
-                content = fake.paragraph(nb_sentences=3)
-            else:
-                content = f"Seeded comment #{i+1} without Faker."
-
-            Comment.objects.create(
-                post=post,
-                user_id=user.id,
-                content=content,
-                created_at=timezone.now(),
-                updated_at=timezone.now(),
-                deleted_at=None,
-                created_by=user.email,
-                updated_by=user.email,
+    def wipe(self):
+        # Table flush instead of QuerySet.delete(): the deletion collector would
+        # load every row (and cascade) into memory first
+        User = get_user_model()
+        models = [Comment, Post, LogEntry, User.groups.through, User.user_permissions.through, User]
+        tables = [model._meta.db_table for model in models]
+        connection.ops.execute_sql_flush(
+            connection.ops.sql_flush(no_style(), tables, reset_sequences=True, allow_cascade=True)
+        )
+
+    def text(self, low, high):
+        return " ".join(self.rng.choices(WORDS, k=self.rng.randint(low, high)))
+
+    def insert(self, manager, rows, label, keep):
+        """
+        bulk_create `rows` (unsaved instances) in batches, one transaction each.
+
+        Only `keep(obj)` of every created row is retained, so memory stays
+        proportional to what later phases need rather than to model instances.
+        """
+        kept = []
+        started = last_report = time.perf_counter()
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                kept.extend(self._flush(manager, batch, keep))
+                batch = []
+                if time.perf_counter() - last_report >= 1:
+                    last_report = time.perf_counter()
+                    self.progress(label, len(kept), started)
+        if batch:
+            kept.extend(self._flush(manager, batch, keep))
+        self.progress(label, len(kept), started, done=True)
+        return kept
+
+    def _flush(self, manager, batch, keep):
+        with transaction.atomic():
+            return [keep(obj) for obj in manager.bulk_create(batch, batch_size=self.batch_size)]
+
+    def progress(self, label, count, started, done=False):
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        line = f"  {label}: {count:,} rows, {count / elapsed:,.0f} rows/s"
+        self.stdout.write(self.style.SUCCESS(f"{line} - done") if done else line)
+
+    # Users / posts / comments
+
+    def seed_users(self, count):
+        User = get_user_model()
+        # Hashing is deliberately slow; every seeded user shares one hash
+        password = make_password("password123")
+
+        def rows():
+            for i in range(count):
+                name = BASE_NAMES[i] if i < len(BASE_NAMES) else f"User {i + 1}"
+                yield User(
+                    email=f"{name.split()[0].lower()}{'' if i < len(BASE_NAMES) else i + 1}@example.com",
+                    password=password,
+                    name=name,
+                    is_author=i % 2 == 0,
+                    mobile=f"9{i:09d}",
+                    created_by=SEED_EMAIL,
+                    updated_by=SEED_EMAIL,
+                )
+        return self.insert(User.objects, rows(), "users", keep=lambda u: (u.id, u.email))
+
+    def seed_posts(self, count, users):
+        statuses = ["draft", "published", "archived"]
+        year = 365 * 24 * 3600
+
+        def rows():
+            for i in range(count):
+                author_id, email = self.rng.choice(users)
+                yield Post(
+                    author_id=author_id,
+                    title=self.text(3, 8).capitalize(),
+                    content=self.text(40, 120),
+                    status=self.rng.choice(statuses),
+                    created_at=self.now - timedelta(seconds=self.rng.randrange(year)),
+                    created_by=email,
+                    updated_by=email,
+                )
+        return self.insert(Post.all_objects, rows(), "posts", keep=lambda p: (p.id, p.created_at))
+
+    def seed_comments(self, count, depth, posts, users):
+        if count <= 0:
+            return 0
+        # Level sizes halve with depth: a reply layer is smaller than the one it answers
+        sizes = []
+        remaining = count
+        for level in range(depth + 1):
+            size = remaining if level == depth else max(1, remaining // 2)
+            sizes.append(size)
+            remaining -= size
+            if not remaining:
+                break
+
+        # Zipf-like popularity so a few posts get most of the discussion
+        weights = [1 / (rank + 1) for rank in range(len(posts))]
+        cumulative = []
+        running = 0.0
+        for w in weights:
+            running += w
+            cumulative.append(running)
+
+        # Ids are assigned here (the wipe reset the sequence) so each row's
+        # materialized path is known before the INSERT
+        next_id = iter(range(1, count + 1))
+        parents = None
+        total = 0
+        for level, size in enumerate(sizes):
+            def rows(level=level, size=size, parents=parents):
+                for _ in range(size):
+                    user_id, email = self.rng.choice(users)
+                    pk = next(next_id)
+                    if parents is None:
+                        post_id, after = self.rng.choices(posts, cum_weights=cumulative)[0]
+                        parent_id, parent_path = None, ""
+                    else:
+                        parent_id, post_id, after, parent_path = self.rng.choice(parents)
+                    yield Comment(
+                        id=pk,
+                        post_id=post_id,
+                        parent_id=parent_id,
+                        path=parent_path + path_segment(pk),
+                        depth=level,
+                        user_id=user_id,
+                        content=self.text(5, 40),
+                        created_at=min(after + timedelta(seconds=self.rng.randrange(1, 86400)), self.now),
+                        created_by=email,
+                        updated_by=email,
+                    )
+            parents = self.insert(
+                Comment.all_objects, rows(), f"comments (depth {level})",
+                keep=lambda c: (c.id, c.post_id, c.created_at, c.path),
             )
-
-        self.stdout.write(self.style.SUCCESS("30 Comments created."))
-        self.stdout.write(self.style.SUCCESS("Database seeding completed successfully!"))
+            total += len(parents)
+        # Explicit ids don't advance a Postgres sequence; SQLite/MySQL track max(id) themselves
+        reset = connection.ops.sequence_reset_sql(no_style(), [Comment])
+        if reset:
+            with connection.cursor() as cursor:
+                for sql in reset:
+                    cursor.execute(sql)
+        return total
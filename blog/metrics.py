@@ -0,0 +1,264 @@
+"""
+In-process metrics in the Prometheus text format, served at /metrics/.
+
+Values live in a per-process store. With BLOG_METRICS_DIR set (gunicorn and
+other pre-fork servers) each process also snapshots its values to
+<dir>/metrics-<pid>.json at most every BLOG_METRICS_FLUSH_SECONDS, and a
+scrape sums every process's file, so whichever worker answers reports the
+whole server.
+"""
+import atexit
+import bisect
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger("blog.metrics")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        METRICS.append(self)
+
+    def key(self, labels):
+        return (self.name, tuple(str(labels[label]) for label in self.labels))
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        store().inc(self.key(labels), amount)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        # Slots: one count per bucket (not cumulative), one for +Inf, then the sum
+        store().observe(self.key(labels), bisect.bisect_left(self.buckets, value), value, len(self.buckets) + 2)
+
+
+METRICS = []
+
+REQUESTS = Counter(
+    "blog_http_requests_total", "Requests served, by route (URL name), method and status.",
+    ("route", "method", "status"),
+)
+LATENCY = Histogram(
+    "blog_http_request_duration_seconds", "Wall time from the first middleware to the response.", ("route",),
+)
+DB_TIME = Histogram(
+    "blog_http_request_db_seconds", "Time spent in database queries per request.", ("route",), DB_BUCKETS,
+)
+QUERIES = Counter("blog_db_queries_total", "Database queries run by requests.", ("route",))
+CACHE = Counter(
+    "blog_response_cache_requests_total", "Response cache lookups, by route and result (hit or miss).",
+    ("route", "result"),
+)
+
+
+class Store:
+    """Process-local values: {(name, label values): number or histogram slots}."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def inc(self, key, amount):
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def observe(self, key, index, value, size):
+        with self.lock:
+            slots = self.values.get(key)
+            if slots is None:
+                slots = self.values[key] = [0] * (size - 1) + [0.0]
+            slots[index] += 1
+            slots[-1] += value
+
+    def snapshot(self):
+        with self.lock:
+            return {key: list(value) if isinstance(value, list) else value for key, value in self.values.items()}
+
+    def collect(self):
+        return [self.snapshot()]
+
+
+class FileStore(Store):
+    """Store that also shares its values with the other processes through `directory`."""
+
+    def __init__(self, directory, interval=1.0, pid=None):
+        super().__init__()
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.path = self.directory / f"metrics-{pid or os.getpid()}.json"
+        self.interval = interval
+        self.flushed = 0.0
+        self.flush_lock = threading.Lock()
+        # A recycled pid continues its predecessor's counters instead of resetting them
+        if self.path.exists():
+            self.values = self.read(self.path)
+        atexit.register(self.flush)
+
+    def inc(self, key, amount):
+        super().inc(key, amount)
+        self.maybe_flush()
+
+    def observe(self, key, index, value, size):
+        super().observe(key, index, value, size)
+        self.maybe_flush()
+
+    def maybe_flush(self):
+        # Request threads skip a flush another thread is already writing
+        if time.monotonic() - self.flushed < self.interval or not self.flush_lock.acquire(blocking=False):
+            return
+        try:
+            self.write()
+        except OSError:
+            # Metrics must never fail the request that recorded them
+            logger.exception("Could not write %s", self.path)
+        finally:
+            self.flush_lock.release()
+
+    def flush(self):
+        with self.flush_lock:
+            self.write()
+
+    def write(self):
+        # Under flush_lock; a temp file per write, so none is replaced from under another
+        self.flushed = time.monotonic()
+        rows = [[name, list(labels), value] for (name, labels), value in self.snapshot().items()]
+        fd, temp = tempfile.mkstemp(dir=self.directory, prefix=f".{self.path.stem}-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as fh:
+                fh.write(json.dumps(rows))
+            os.replace(temp, self.path)  # atomic: readers see the old or the new file
+        except BaseException:
+            os.unlink(temp)
+            raise
+
+    @staticmethod
+    def read(path):
+        try:
+            rows = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return {}
+        return {(name, tuple(labels)): value for name, labels, value in rows}
+
+    def collect(self):
+        self.flush()
+        return [self.read(path) for path in sorted(self.directory.glob("metrics-*.json"))]
+
+
+_store = None
+_store_pid = None
+_store_lock = threading.Lock()
+
+
+def store():
+    global _store, _store_pid
+    # A forked worker must not keep counting into its parent's store
+    if _store_pid != os.getpid():
+        with _store_lock:
+            if _store_pid != os.getpid():
+                directory = getattr(settings, "BLOG_METRICS_DIR", None)
+                if directory:
+                    _store = FileStore(directory, getattr(settings, "BLOG_METRICS_FLUSH_SECONDS", 1.0))
+                else:
+                    _store = Store()
+                _store_pid = os.getpid()
+    return _store
+
+
+def reset_metrics():
+    global _store_pid
+    _store_pid = None
+
+
+def observe_request(route, method, status, seconds, queries, db_seconds, cache_result=None):
+    route = route or "unmatched"
+    REQUESTS.inc(route=route, method=method, status=status)
+    LATENCY.observe(seconds, route=route)
+    DB_TIME.observe(db_seconds, route=route)
+    if queries:
+        QUERIES.inc(queries, route=route)
+    if cache_result:
+        CACHE.inc(route=route, result=cache_result)
+
+
+# Exposition
+
+def _merge(snapshots):
+    merged = {}
+    for snapshot in snapshots:
+        for key, value in snapshot.items():
+            if isinstance(value, list):
+                slots = merged.setdefault(key, [0] * len(value))
+                for i, v in enumerate(value):
+                    slots[i] += v
+            else:
+                merged[key] = merged.get(key, 0) + value
+    return merged
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for name, value in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def exposition():
+    """Every metric, summed over all processes, in the Prometheus text format."""
+    values = _merge(store().collect())
+    lines = []
+    for metric in METRICS:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        series = sorted((labels, value) for (name, labels), value in values.items() if name == metric.name)
+        for labels, value in series:
+            if metric.kind == "counter":
+                lines.append(f"{metric.name}{_labels(metric.labels, labels)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip((*metric.buckets, "+Inf"), value[:-1]):
+                cumulative += count
+                le = bound if bound == "+Inf" else _number(float(bound))
+                lines.append(f"{metric.name}_bucket{_labels(metric.labels, labels, [('le', le)])} {cumulative}")
+            lines.append(f"{metric.name}_sum{_labels(metric.labels, labels)} {_number(value[-1])}")
+            lines.append(f"{metric.name}_count{_labels(metric.labels, labels)} {cumulative}")
+
+    # Derived for dashboards; rate(...) over the counter is better for alerting
+    hits = sum(v for (name, labels), v in values.items() if name == CACHE.name and labels[-1] == "hit")
+    lookups = sum(v for (name, labels), v in values.items() if name == CACHE.name)
+    lines.append("# HELP blog_response_cache_hit_ratio Response cache hits over lookups since start.")
+    lines.append("# TYPE blog_response_cache_hit_ratio gauge")
+    lines.append(f"blog_response_cache_hit_ratio {_number(hits / lookups if lookups else 0.0)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,96 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .instrumentation import finish_request, start_request
+from .routers import pin_to_primary, unpin
+
+PIN_COOKIE = "blog_primary_until"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS", "TRACE")
+
+
+def _pin_seconds():
+    return getattr(settings, "BLOG_REPLICA_PIN_SECONDS", 5)
+
+
+class ReplicaPinningMiddleware:
+    """
+    Read-your-writes for replica routing: after a successful write request the
+    client gets a short-lived cookie, and while it is valid its reads go to
+    the primary. A cookie instead of the session keeps this free of DB writes.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = pin_to_primary(self._pinned(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            unpin(token)
+        return self._remember_write(request, response)
+
+    async def __acall__(self, request):
+        token = pin_to_primary(self._pinned(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            unpin(token)
+        return self._remember_write(request, response)
+
+    def _pinned(self, request):
+        try:
+            return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def _remember_write(self, request, response):
+        seconds = _pin_seconds()
+        if request.method not in SAFE_METHODS and response.status_code < 400 and seconds > 0:
+            response.set_cookie(PIN_COOKIE, f"{time.time() + seconds:.3f}", max_age=seconds, httponly=True, samesite="Lax")
+        return response
+
+
+class RequestInstrumentationMiddleware:
+    """
+    Per-request cost: query count, DB time, repeated query shapes (N+1
+    loops), view and total wall time. Reported as a Server-Timing header
+    (BLOG_SERVER_TIMING) and a "blog.requests" log line; a request over its
+    BLOG_QUERY_BUDGETS entry logs a warning, or fails under
+    BLOG_QUERY_BUDGET_ENFORCE (tests). Goes first in MIDDLEWARE so session
+    and auth queries count as well.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, token = start_request()
+        request.blog_stats = stats
+        response = self.get_response(request)
+        return finish_request(request, response, stats, token)
+
+    async def __acall__(self, request):
+        stats, token = start_request()
+        request.blog_stats = stats
+        response = await self.get_response(request)
+        return finish_request(request, response, stats, token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.blog_stats.view_started = time.perf_counter()
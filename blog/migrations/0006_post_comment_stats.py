@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-17 22:13
+
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_comment_stats(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    Comment = apps.get_model('blog', 'Comment')
+    live = (
+        Comment.objects.filter(post=OuterRef('pk'), deleted_at__isnull=True)
+        .order_by().values('post').annotate(n=Count('pk')).values('n')
+    )
+    last = (
+        Comment.objects.filter(post=OuterRef('pk'))
+        .order_by().values('post').annotate(at=Max('updated_at')).values('at')
+    )
+    Post.objects.update(comment_count=Coalesce(Subquery(live), 0), last_activity_at=Subquery(last))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_change_tracking_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='last_activity_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_comment_stats, migrations.RunPython.noop),
+    ]
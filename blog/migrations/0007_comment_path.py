@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-17 22:24
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Concat, LPad
+
+
+def backfill_comment_paths(apps, schema_editor):
+    # Frozen copy of blog.comment_paths.backfill_paths: 10-digit zero-padded
+    # decimal segments, written one tree level per UPDATE
+    Comment = apps.get_model('blog', 'Comment')
+    comments = Comment._base_manager.using(schema_editor.connection.alias).order_by()
+    segment = Concat(LPad(Cast('id', models.CharField(max_length=10)), 10, Value('0')), Value('/'))
+    parent_path = Subquery(Comment._base_manager.filter(pk=OuterRef('parent_id')).values('path')[:1])
+
+    if not comments.filter(parent__isnull=True).update(path=segment, depth=0):
+        return
+    depth = 1
+    while comments.filter(path='', parent__depth=depth - 1).exclude(parent__path='').update(
+        path=Concat(parent_path, segment), depth=depth,
+    ):
+        depth += 1
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_post_comment_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(blank=True, default='', editable=False, max_length=1024),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['post', 'path'], name='blog_comment_live_path_idx'),
+        ),
+        migrations.RunPython(backfill_comment_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+from django.db import migrations
+
+# The schema as of this migration, frozen: blog.search may change its queries,
+# but a later change to the index belongs in a new migration.
+SQLITE_SCHEMA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS blog_post_fts USING fts5(
+        title, content, content='blog_post', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS blog_post_fts_ai AFTER INSERT ON blog_post BEGIN
+        INSERT INTO blog_post_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS blog_post_fts_ad AFTER DELETE ON blog_post BEGIN
+        INSERT INTO blog_post_fts(blog_post_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS blog_post_fts_au AFTER UPDATE OF title, content ON blog_post
+    WHEN old.title IS NOT new.title OR old.content IS NOT new.content BEGIN
+        INSERT INTO blog_post_fts(blog_post_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO blog_post_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+    "INSERT INTO blog_post_fts(blog_post_fts) VALUES ('rebuild')",
+]
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS blog_post_fts_au",
+    "DROP TRIGGER IF EXISTS blog_post_fts_ad",
+    "DROP TRIGGER IF EXISTS blog_post_fts_ai",
+    "DROP TABLE IF EXISTS blog_post_fts",
+]
+POSTGRES_SCHEMA = [
+    "CREATE INDEX IF NOT EXISTS blog_post_search_idx ON blog_post USING gin (("
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(content, '')), 'B')))",
+]
+POSTGRES_DROP = ["DROP INDEX IF EXISTS blog_post_search_idx"]
+
+
+# Raw SQL: neither FTS5 tables/triggers nor the tsvector expression index are
+# expressible as model state, and each exists on one vendor only
+def _run(schema_editor, statements):
+    for sql in statements.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(sql, params=None)
+
+
+def create_search_index(apps, schema_editor):
+    _run(schema_editor, {"sqlite": SQLITE_SCHEMA, "postgresql": POSTGRES_SCHEMA})
+
+
+def drop_search_index(apps, schema_editor):
+    _run(schema_editor, {"sqlite": SQLITE_DROP, "postgresql": POSTGRES_DROP})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_comment_path'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
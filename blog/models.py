@@ -1,8 +1,73 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, Count, F, Max, OuterRef, Subquery, Value, When
+from django.db.models.functions import Cast, Coalesce, Concat, Greatest, LPad
 from django.utils import timezone
 from accounts.models import CustomUser
 
 
+# Materialized path: each comment stores its ancestors' ids plus its own as fixed-width
+# zero-padded segments ("0000000104/0000000107/"), so a subtree is one prefix range
+# and ordering by path yields a depth-first thread. Decimal keeps the segment
+# computable in SQL (see path_segment_sql) for set-based backfills.
+PATH_SEGMENT_WIDTH = 10
+PATH_MAX_LENGTH = 1024
+# Deepest reply whose path still fits the column (depth is 0-based)
+MAX_COMMENT_DEPTH = PATH_MAX_LENGTH // (PATH_SEGMENT_WIDTH + 1) - 1
+
+
+def path_segment(pk):
+    return f"{pk:0{PATH_SEGMENT_WIDTH}d}/"
+
+
+def path_segment_sql(field='id'):
+    """Database-side path_segment() of an integer column."""
+    return Concat(
+        LPad(Cast(field, models.CharField(max_length=PATH_SEGMENT_WIDTH)), PATH_SEGMENT_WIDTH, Value('0')),
+        Value('/'),
+    )
+
+
+def path_range(prefix):
+    # "~" sorts after every segment character, so [prefix, prefix~) is the subtree
+    return prefix, prefix + "~"
+
+
+def _audit(by, now):
+    # `by` may be a user or an email; update() skips auto_now, so stamp updated_at here
+    fields = {"updated_at": now}
+    if by is not None:
+        fields["updated_by"] = getattr(by, "email", by)
+    return fields
+
+
+class SoftDeleteQuerySet(models.QuerySet):
+    def live(self):
+        return self.filter(deleted_at__isnull=True)
+
+    def trashed(self):
+        return self.filter(deleted_at__isnull=False)
+
+    # Bulk actions: one UPDATE whatever the row count; each returns rows affected
+    def soft_delete(self, by=None):
+        now = timezone.now()
+        return self.live().update(deleted_at=now, **_audit(by, now))
+
+    def restore(self, by=None):
+        now = timezone.now()
+        return self.trashed().update(deleted_at=None, **_audit(by, now))
+
+
+class LiveManager(models.Manager.from_queryset(SoftDeleteQuerySet)):
+    """Default manager: hides soft-deleted rows so queries hit the partial indexes."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
+class AllObjectsManager(models.Manager.from_queryset(SoftDeleteQuerySet)):
+    """Escape hatch for trash views and maintenance: includes soft-deleted rows."""
+
+
 class BaseModel(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
@@ -10,6 +75,9 @@ class BaseModel(models.Model):
     created_by = models.EmailField(null=True, blank=True)
     updated_by = models.EmailField(null=True, blank=True)
 
+    objects = LiveManager()
+    all_objects = AllObjectsManager()
+
     class Meta:
         abstract = True
 
@@ -18,6 +86,96 @@ class BaseModel(models.Model):
         self.save(update_fields=["deleted_at", "updated_at"])
 
 
+class PostQuerySet(SoftDeleteQuerySet):
+    def soft_delete(self, by=None):
+        """Trash these posts and their live comments in one transaction (two UPDATEs)."""
+        now = timezone.now()
+        with transaction.atomic():
+            targets = self.live()
+            # Comments share the posts' deleted_at, which is how restore() finds them again
+            Comment.objects.filter(post__in=targets.values('pk')).update(deleted_at=now, **_audit(by, now))
+            return targets.update(
+                deleted_at=now,
+                comment_count=0,
+                last_activity_at=Case(
+                    When(comment_count__gt=0, then=Value(now)), default=F('last_activity_at'),
+                ),
+                **_audit(by, now),
+            )
+
+    def restore(self, by=None):
+        """Bring posts back with the comments their soft_delete() cascaded to."""
+        now = timezone.now()
+        with transaction.atomic():
+            targets = self.trashed()
+            ids = list(targets.values_list('pk', flat=True))
+            Comment.all_objects.filter(
+                post__in=ids, deleted_at=F('post__deleted_at'),
+            ).update(deleted_at=None, **_audit(by, now))
+            count = Post.all_objects.filter(pk__in=ids).update(deleted_at=None, **_audit(by, now))
+            Post.all_objects.filter(pk__in=ids).refresh_comment_stats()
+        return count
+
+    def publish(self, by=None):
+        return self._set_status('published', by)
+
+    def archive(self, by=None):
+        return self._set_status('archived', by)
+
+    def _set_status(self, status, by):
+        now = timezone.now()
+        return self.exclude(status=status).update(status=status, **_audit(by, now))
+
+    def refresh_comment_stats(self):
+        """Recompute comment_count / last_activity_at for these posts in one UPDATE."""
+        live = (
+            Comment.objects.filter(post=OuterRef('pk'))
+            .order_by().values('post').annotate(n=Count('pk')).values('n')
+        )
+        last = (
+            Comment.all_objects.filter(post=OuterRef('pk'))
+            .order_by().values('post').annotate(at=Max('updated_at')).values('at')
+        )
+        return self.update(
+            comment_count=Coalesce(Subquery(live), 0),
+            last_activity_at=Subquery(last),
+        )
+
+
+class CommentQuerySet(SoftDeleteQuerySet):
+    def subtree(self, comment, include_self=True):
+        """`comment` and all of its descendants, as one indexed range scan."""
+        low, high = path_range(comment.path)
+        qs = self.filter(post_id=comment.post_id, path__gte=low, path__lt=high)
+        return qs if include_self else qs.exclude(pk=comment.pk)
+
+    def threads(self, post_id):
+        """Root comments of a post, oldest first (slice for "top N threads")."""
+        return self.filter(post_id=post_id, parent__isnull=True).order_by('created_at', 'id')
+
+    def up_to_depth(self, depth):
+        return self.filter(depth__lte=depth)
+
+    def in_thread_order(self):
+        return self.order_by('path')
+
+    def soft_delete(self, by=None):
+        with transaction.atomic():
+            targets = self.live()
+            post_ids = list(targets.values_list('post_id', flat=True).distinct())
+            count = super().soft_delete(by)
+            Post.all_objects.filter(pk__in=post_ids).refresh_comment_stats()
+        return count
+
+    def restore(self, by=None):
+        with transaction.atomic():
+            targets = self.trashed()
+            post_ids = list(targets.values_list('post_id', flat=True).distinct())
+            count = super().restore(by)
+            Post.all_objects.filter(pk__in=post_ids).refresh_comment_stats()
+        return count
+
+
 class Post(BaseModel):
     STATUS_CHOICES = (
         ('draft', 'Draft'),
@@ -35,13 +193,42 @@ class Post(BaseModel):
     content = models.TextField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft')
 
+    # Denormalized from Comment: live comments at any depth, and the newest
+    # comment write (add, edit or soft delete). recount_posts repairs drift.
+    comment_count = models.PositiveIntegerField(default=0)
+    last_activity_at = models.DateTimeField(null=True, blank=True)
+
+    objects = LiveManager.from_queryset(PostQuerySet)()
+    all_objects = AllObjectsManager.from_queryset(PostQuerySet)()
+
     def __str__(self):
         return f"{self.title} ({self.status})"
 
+    @classmethod
+    def track_comments(cls, post_id, delta=0, at=None):
+        # Atomic in SQL (F-expressions), so concurrent comment writes never lose counts.
+        # updated_at moves too: the row changed, and the list validators key on it.
+        at = at or timezone.now()
+        cls.all_objects.filter(pk=post_id).update(
+            comment_count=Greatest(F('comment_count') + delta, 0),
+            last_activity_at=at,
+            updated_at=at,
+        )
+
     class Meta:
         permissions = [
             ("publish_post", "Can publish post"),
         ]
+        indexes = [
+            # Published list: status filter + (created_at, id) keyset over live rows only
+            models.Index(
+                fields=['status', '-created_at', '-id'],
+                name='blog_post_live_status_idx',
+                condition=models.Q(deleted_at__isnull=True),
+            ),
+            # Newest change across all posts, for list ETag/Last-Modified
+            models.Index(fields=['updated_at'], name='blog_post_updated_idx'),
+        ]
 
 
 class Comment(BaseModel):
@@ -50,10 +237,65 @@ class Comment(BaseModel):
     # Optional parent for nested replies
     parent = models.ForeignKey('self', null=True, blank=True, on_delete=models.CASCADE, related_name='replies')
     content = models.TextField()
+    # Maintained by save() (and backfill_comment_paths for bulk-inserted rows)
+    path = models.CharField(max_length=PATH_MAX_LENGTH, blank=True, default='', editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    objects = LiveManager.from_queryset(CommentQuerySet)()
+    all_objects = AllObjectsManager.from_queryset(CommentQuerySet)()
 
     def __str__(self):
         return f"Comment by {self.user.email}"
 
+    def save(self, *args, **kwargs):
+        if self.pk is not None or self.path:
+            return super().save(*args, **kwargs)
+        # New row: the path ends with our own id, so write it right after the INSERT
+        with transaction.atomic():
+            parent_path = ""
+            if self.parent_id is not None:
+                if Comment.parent.is_cached(self):
+                    parent_path, parent_depth = self.parent.path, self.parent.depth
+                else:
+                    parent_path, parent_depth = (
+                        Comment.all_objects.filter(pk=self.parent_id).values_list('path', 'depth').get()
+                    )
+                self.depth = parent_depth + 1
+            super().save(*args, **kwargs)
+            self.path = parent_path + path_segment(self.pk)
+            Comment.all_objects.filter(pk=self.pk).update(path=self.path)
+
+    def soft_delete(self):
+        if self.deleted_at is not None:
+            return
+        with transaction.atomic():
+            super().soft_delete()
+            Post.track_comments(self.post_id, -1, at=self.deleted_at)
+
     @property
     def is_root(self):
         return self.parent_id is None
+
+    class Meta:
+        indexes = [
+            # Whole-post tree load ordered for display
+            models.Index(
+                fields=['post', 'created_at', 'id'],
+                name='blog_comment_live_post_idx',
+                condition=models.Q(deleted_at__isnull=True),
+            ),
+            # Root comments of a post (parent IS NULL) and direct replies of a comment
+            models.Index(
+                fields=['post', 'parent', 'created_at', 'id'],
+                name='blog_comment_live_thread_idx',
+                condition=models.Q(deleted_at__isnull=True),
+            ),
+            # Newest change among a post's comments (trashed included), for detail validators
+            models.Index(fields=['post', 'updated_at'], name='blog_comment_post_updated_idx'),
+            # Subtree range scans and depth-first thread order
+            models.Index(
+                fields=['post', 'path'],
+                name='blog_comment_live_path_idx',
+                condition=models.Q(deleted_at__isnull=True),
+            ),
+        ]
@@ -0,0 +1,147 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.db.models import Q
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+NEXT = "n"
+PREV = "p"
+
+
+class CursorError(ValueError):
+    pass
+
+
+def _pack(values):
+    raw = json.dumps(values, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _unpack(value):
+    return json.loads(base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)))
+
+
+def encode_cursor(created_at, pk, direction=NEXT):
+    return _pack([created_at.isoformat(), pk, direction])
+
+
+def decode_cursor(value):
+    try:
+        created_at, pk, direction = _unpack(value)
+        created_at = datetime.fromisoformat(created_at)
+        pk = int(pk)
+    except (binascii.Error, ValueError, TypeError, UnicodeDecodeError):
+        raise CursorError("invalid cursor")
+    if direction not in (NEXT, PREV):
+        raise CursorError("invalid cursor")
+    return created_at, pk, direction
+
+
+def encode_rank_cursor(score, pk):
+    # Ranked results (search) seek on (score, id) instead of (created_at, id)
+    return _pack([score, pk])
+
+
+def decode_rank_cursor(value):
+    try:
+        score, pk = _unpack(value)
+        return float(score), int(pk)
+    except (binascii.Error, ValueError, TypeError, UnicodeDecodeError):
+        raise CursorError("invalid cursor")
+
+
+def parse_limit(value, default=DEFAULT_LIMIT, maximum=MAX_LIMIT, minimum=1, name="limit"):
+    if value in (None, ""):
+        return default
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise CursorError(f"invalid {name}")
+    if limit < minimum:
+        raise CursorError(f"invalid {name}")
+    return min(limit, maximum)
+
+
+def run_queries(steps):
+    """
+    Drive a query-step generator: it yields querysets and is sent each one's
+    rows back, then returns its result. The same steps run under the async
+    ORM with arun_queries(), so sync and async views share one implementation.
+    """
+    try:
+        query = next(steps)
+        while True:
+            query = steps.send(list(query))
+    except StopIteration as done:
+        return done.value
+
+
+async def arun_queries(steps):
+    try:
+        query = next(steps)
+        while True:
+            query = steps.send([row async for row in query])
+    except StopIteration as done:
+        return done.value
+
+
+def keyset_steps(queryset, cursor=None, limit=DEFAULT_LIMIT, descending=True):
+    """
+    Slice `queryset` (values() rows with created_at and id) on (created_at, id).
+
+    Seeks past the cursor with a range predicate instead of OFFSET, so every
+    page costs one index range scan of `limit + 1` rows. Returns
+    (rows, next_cursor, prev_cursor); cursors are None at either end.
+    """
+    created_at = pk = None
+    direction = NEXT
+    if cursor:
+        created_at, pk, direction = decode_cursor(cursor)
+
+    # Walking backwards flips the comparison and the ordering, then the page is reversed
+    forward = direction == NEXT
+    newest_first = descending == forward
+    if created_at is not None:
+        # The redundant bound on created_at alone is what the planner turns into
+        # an index range; the OR form alone makes it walk the index from the top
+        if newest_first:
+            seek = Q(created_at__lte=created_at) & (Q(created_at__lt=created_at) | Q(id__lt=pk))
+        else:
+            seek = Q(created_at__gte=created_at) & (Q(created_at__gt=created_at) | Q(id__gt=pk))
+        queryset = queryset.filter(seek)
+    ordering = ('-created_at', '-id') if newest_first else ('created_at', 'id')
+    rows = yield queryset.order_by(*ordering)[:limit + 1]
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if not forward:
+        rows.reverse()
+    if not rows:
+        return rows, None, None
+
+    first, last = rows[0], rows[-1]
+    has_next = has_more if forward else True
+    has_prev = cursor is not None if forward else has_more
+    next_cursor = encode_cursor(last['created_at'], last['id'], NEXT) if has_next else None
+    prev_cursor = encode_cursor(first['created_at'], first['id'], PREV) if has_prev else None
+    return rows, next_cursor, prev_cursor
+
+
+def keyset_page(queryset, cursor=None, limit=DEFAULT_LIMIT, descending=True):
+    return run_queries(keyset_steps(queryset, cursor, limit, descending))
+
+
+async def akeyset_page(queryset, cursor=None, limit=DEFAULT_LIMIT, descending=True):
+    return await arun_queries(keyset_steps(queryset, cursor, limit, descending))
+
+
+def page_link(request, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query["cursor"] = cursor
+    return request.build_absolute_uri(f"{request.path}?{query.urlencode()}")
@@ -0,0 +1,83 @@
+import random
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Set by @replica_reads for the duration of a read-only view: holds the
+# replica that view call reads from, picked on its first query
+_replica_reads = ContextVar("blog_replica_reads", default=None)
+# Set by ReplicaPinningMiddleware while a client is inside its post-write window
+_pinned = ContextVar("blog_pinned_to_primary", default=False)
+
+
+def replicas():
+    return getattr(settings, "DATABASE_REPLICAS", [])
+
+
+def replica_reads(view):
+    """Let the view's queries go to a replica (unless the client is pinned to primary)."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            token = _replica_reads.set({})
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _replica_reads.reset(token)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        token = _replica_reads.set({})
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _replica_reads.reset(token)
+    return wrapper
+
+
+def pin_to_primary(pinned=True):
+    """Route this context's reads to primary; returns a token for _pinned.reset()."""
+    return _pinned.set(pinned)
+
+
+def unpin(token):
+    _pinned.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Reads inside @replica_reads views go to a random replica, the same one for
+    every query of the view call: the conditional GET validators and the body
+    must come from one snapshot, since cached bodies are keyed on the ETag.
+    Everything else, writes included, goes to the default (primary) alias.
+
+    Replicas lag the primary, so reads fall back to primary when the client
+    wrote recently (see ReplicaPinningMiddleware) or when the primary has a
+    transaction open, whose uncommitted rows no replica can see.
+    """
+
+    def db_for_read(self, model, **hints):
+        chosen = _replica_reads.get()
+        if chosen is None or _pinned.get():
+            return None
+        aliases = replicas()
+        if not aliases or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        if "alias" not in chosen:
+            chosen["alias"] = random.choice(aliases)
+        return chosen["alias"]
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema through replication
+        return db not in replicas()
@@ -0,0 +1,123 @@
+import re
+
+from django.db import connections, router
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+
+# Full-text index over Post title/content. SQLite uses an FTS5 external-content
+# table kept in sync by triggers; Postgres a GIN expression index over a
+# weighted tsvector. Other backends fall back to LIKE scans.
+# Migration 0009_post_search creates both.
+FTS_TABLE = "blog_post_fts"
+# Must stay identical to the indexed expression or Postgres will not use the index
+PG_DOCUMENT = (
+    "setweight(to_tsvector('english', coalesce({t}title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce({t}content, '')), 'B')"
+)
+# Title matches weigh ten times body matches in bm25
+FTS_WEIGHTS = (10.0, 1.0)
+MAX_TERMS = 16
+
+_WORD = re.compile(r"\w+")
+
+
+def search_terms(text):
+    """Words of a user query; operators and quotes are dropped so input can't break MATCH syntax."""
+    return _WORD.findall(text or "")[:MAX_TERMS]
+
+
+def _fts_match(terms):
+    # Every term must match (implicit AND); quoting keeps FTS5 keywords literal
+    return " ".join('"{}"'.format(term.replace('"', '')) for term in terms)
+
+
+class LikeSearch:
+    """Fallback: case-insensitive substring match, unranked."""
+
+    indexed = False
+
+    def filter(self, queryset, terms):
+        for term in terms:
+            queryset = queryset.filter(Q(title__icontains=term) | Q(content__icontains=term))
+        return queryset
+
+    def ranked(self, terms, after=None, limit=20):
+        qs = self.filter(_searchable(), terms).order_by('id')
+        if after:
+            qs = qs.filter(id__gt=after[1])
+        return [(0.0, pk) for pk in qs.values_list('id', flat=True)[:limit]]
+
+
+class SQLiteSearch(LikeSearch):
+    indexed = True
+
+    def filter(self, queryset, terms):
+        return queryset.filter(id__in=RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", (_fts_match(terms),),
+        ))
+
+    def ranked(self, terms, after=None, limit=20):
+        # bm25() is lower-is-better; negate so every backend reports higher = better
+        sql = f"""
+            SELECT score, id FROM (
+                SELECT -bm25({FTS_TABLE}, %s, %s) AS score, p.id AS id
+                FROM {FTS_TABLE} JOIN blog_post p ON p.id = {FTS_TABLE}.rowid
+                WHERE {FTS_TABLE} MATCH %s AND p.status = 'published' AND p.deleted_at IS NULL
+            )
+        """
+        params = [*FTS_WEIGHTS, _fts_match(terms)]
+        if after:
+            sql += " WHERE score < %s OR (score = %s AND id > %s)"
+            params += [after[0], after[0], after[1]]
+        sql += " ORDER BY score DESC, id LIMIT %s"
+        with connections[_read_alias()].cursor() as cursor:
+            cursor.execute(sql, params + [limit])
+            return cursor.fetchall()
+
+
+class PostgresSearch(LikeSearch):
+    indexed = True
+
+    def filter(self, queryset, terms):
+        document = PG_DOCUMENT.format(t="s.")
+        return queryset.filter(id__in=RawSQL(
+            f"SELECT s.id FROM blog_post s WHERE {document} @@ plainto_tsquery('english', %s)",
+            (" ".join(terms),),
+        ))
+
+    def ranked(self, terms, after=None, limit=20):
+        document = PG_DOCUMENT.format(t="p.")
+        sql = f"""
+            SELECT score, id FROM (
+                SELECT ts_rank_cd({document}, q) AS score, p.id AS id
+                FROM blog_post p, plainto_tsquery('english', %s) q
+                WHERE {document} @@ q AND p.status = 'published' AND p.deleted_at IS NULL
+            ) ranked
+        """
+        params = [" ".join(terms)]
+        if after:
+            sql += " WHERE score < %s OR (score = %s AND id > %s)"
+            params += [after[0], after[0], after[1]]
+        sql += " ORDER BY score DESC, id LIMIT %s"
+        with connections[_read_alias()].cursor() as cursor:
+            cursor.execute(sql, params + [limit])
+            return cursor.fetchall()
+
+
+_BACKENDS = {"sqlite": SQLiteSearch, "postgresql": PostgresSearch}
+
+
+def _read_alias():
+    # Where the view's Post reads go (a replica under @replica_reads), so the
+    # raw ranked ids and the rows fetched for them come from one database
+    return router.db_for_read(Post)
+
+
+def search_backend():
+    return _BACKENDS.get(connections[_read_alias()].vendor, LikeSearch)()
+
+
+def _searchable():
+    return Post.objects.filter(status="published")
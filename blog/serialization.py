@@ -0,0 +1,69 @@
+import json
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder gives the same JSON, slower
+    orjson = None
+
+CONTENT_TYPE = "application/json"
+
+_django_default = DjangoJSONEncoder().default
+
+
+def format_datetime(value):
+    """
+    The string DjangoJSONEncoder writes for a datetime (milliseconds, UTC as
+    "Z"). Views format hot-path timestamps up front so neither encoder falls
+    back to a per-object default() call for them.
+    """
+    if value is None:
+        return None
+    text = value.isoformat(timespec="milliseconds" if value.microsecond else "seconds")
+    return text[:-6] + "Z" if text.endswith("+00:00") else text
+
+
+def format_datetimes(rows, *fields):
+    # In place: the rows are already the response objects
+    for row in rows:
+        for field in fields:
+            row[field] = format_datetime(row[field])
+    return rows
+
+
+def _stdlib_dumps(data):
+    # Compact UTF-8, byte for byte what orjson writes
+    return json.dumps(data, cls=DjangoJSONEncoder, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def _orjson_dumps(data):
+    # Datetimes that weren't pre-formatted go through Django's default() so
+    # both encoders agree on the format
+    return orjson.dumps(data, default=_django_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+
+
+def serializer(name=None):
+    """The dumps() for BLOG_JSON_SERIALIZER: "orjson", "stdlib" or "auto" (orjson when installed)."""
+    name = name or getattr(settings, "BLOG_JSON_SERIALIZER", "auto")
+    if name == "auto":
+        name = "orjson" if orjson is not None else "stdlib"
+    if name == "orjson":
+        if orjson is None:
+            raise ImproperlyConfigured("BLOG_JSON_SERIALIZER = 'orjson' needs orjson installed (pip install orjson).")
+        return _orjson_dumps
+    if name == "stdlib":
+        return _stdlib_dumps
+    raise ImproperlyConfigured(f"BLOG_JSON_SERIALIZER must be 'auto', 'orjson' or 'stdlib', got {name!r}")
+
+
+def dumps(data):
+    return serializer()(data)
+
+
+def json_response(data, status=200):
+    """JsonResponse replacement that encodes with the configured serializer."""
+    return HttpResponse(dumps(data), content_type=CONTENT_TYPE, status=status)
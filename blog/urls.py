@@ -1,13 +1,22 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Read endpoints that have a native async version (see BLOG_ASYNC_VIEWS)
+reads = async_views if settings.BLOG_ASYNC_VIEWS else views
 
 urlpatterns = [
-    path('posts/', views.post_list_api, name='api-post-list'),
-    path('posts/<int:pk>/', views.post_detail_api, name='api-post-detail'),
+    path('posts/', reads.post_list_api, name='api-post-list'),
+    path('posts/search/', views.post_search_api, name='api-post-search'),
+    path('posts/<int:pk>/', reads.post_detail_api, name='api-post-detail'),
+    path('posts/<int:pk>/comments/', reads.post_comments_api, name='api-post-comments'),
     path('posts/create/', views.create_post_api, name='api-post-create'),
     path('posts/<int:pk>/update/', views.update_post_api, name='api-post-update'),
     path('posts/<int:pk>/delete/', views.delete_post_api, name='api-post-delete'),
     path('posts/<int:pk>/publish/', views.publish_post_api, name='api-post-publish'),
     path('posts/<int:pk>/comments/add/', views.add_comment_api, name='api-add-comment'),
     path('auth/session-login/', views.session_login_api, name='api-session-login'),
+    path('export/', views.export_api, name='api-export'),
+    path('cache/stats/', views.cache_stats_api, name='api-cache-stats'),
+    path('metrics/', views.metrics_api, name='metrics'),
 ]
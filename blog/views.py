@@ -1,51 +1,183 @@
-from django.http import JsonResponse
+from django.http import Http404, HttpResponse, QueryDict, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.decorators import login_required
 from accounts.policies import Policy  # middleware attaches request.policy
 from django.contrib.auth import authenticate, login
-from .models import Post, Comment
+from django.conf import settings
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.db import transaction
+from .models import MAX_COMMENT_DEPTH, Post, Comment
+from .comment_tree import (
+    DEFAULT_MAX_DEPTH, DEFAULT_REPLIES, MAX_DEPTH, MAX_REPLIES, comment_page,
+)
+from .cache import (
+    bump_global_version, cache_response, cache_stats,
+    post_comments_key, post_detail_key, post_list_key,
+)
+from .export import CONTENT_TYPE as NDJSON, export_records, ndjson_chunks
+from .metrics import CONTENT_TYPE as PROMETHEUS, exposition
+from .comment_queue import PendingComment, buffered_writes, comment_queue
+from .conditional import (
+    conditional_response, post_comments_validators, post_detail_validators, post_list_validators,
+)
+from .pagination import (
+    CursorError, decode_rank_cursor, encode_rank_cursor, keyset_page, page_link, parse_limit,
+)
+from .search import search_backend, search_terms
+from .serialization import format_datetime, format_datetimes, json_response
+from .routers import replica_reads
 
 # Small helpers to keep views DRY
 def json_error(message, status):
-    return JsonResponse({"error": message}, status=status)
+    return json_response({"error": message}, status=status)
 
 def get_post_active(pk):
-    return get_object_or_404(Post, pk=pk, deleted_at__isnull=True)
+    # Default manager already excludes soft-deleted posts
+    return get_object_or_404(Post, pk=pk)
 
+def write_refused(pk):
+    # A scoped write matched no row: the post is gone (404) or not this user's (403)
+    if not Post.objects.filter(pk=pk).exists():
+        raise Http404("No Post matches the given query.")
+    return json_error("forbidden", 403)
+
+POST_LIST_FIELDS = (
+    'id', 'title', 'author__email', 'status', 'created_at', 'comment_count', 'last_activity_at',
+)
+
+def published_posts():
+    return Post.objects.filter(status="published").values(*POST_LIST_FIELDS)
+
+def post_list_data(request, posts, next_cursor, prev_cursor):
+    return {
+        "posts": format_datetimes(posts, 'created_at', 'last_activity_at'),
+        "next": page_link(request, next_cursor),
+        "previous": page_link(request, prev_cursor),
+    }
+
+@replica_reads
+@conditional_response(post_list_validators)
+@cache_response(post_list_key)
 def post_list_api(request):
-    posts = Post.objects.filter(
-        deleted_at__isnull=True,
-        status="published"
-    ).order_by('-created_at').values('id', 'title', 'author__email', 'status', 'created_at')
-    return JsonResponse({"posts": list(posts)})
+    try:
+        limit = parse_limit(request.GET.get("limit"))
+        posts, next_cursor, prev_cursor = keyset_page(
+            published_posts(),
+            cursor=request.GET.get("cursor"),
+            limit=limit,
+        )
+    except CursorError as exc:
+        return json_error(str(exc), 400)
+    return json_response(post_list_data(request, posts, next_cursor, prev_cursor))
+
+@replica_reads
+@conditional_response(post_list_validators)
+@cache_response(post_list_key)
+def post_search_api(request):
+    # Ranked by relevance (best first); pages continue from (score, id)
+    terms = search_terms(request.GET.get("q"))
+    if not terms:
+        return json_error("q required", 400)
+    try:
+        limit = parse_limit(request.GET.get("limit"))
+        cursor = request.GET.get("cursor")
+        after = decode_rank_cursor(cursor) if cursor else None
+    except CursorError as exc:
+        return json_error(str(exc), 400)
+    hits = search_backend().ranked(terms, after=after, limit=limit + 1)
+    more = len(hits) > limit
+    hits = hits[:limit]
+    rows = Post.objects.filter(pk__in=[pk for _, pk in hits]).values(*POST_LIST_FIELDS)
+    by_id = {row['id']: row for row in rows}
+    posts = []
+    for score, pk in hits:
+        if pk in by_id:
+            by_id[pk]["score"] = score
+            posts.append(by_id[pk])
+    format_datetimes(posts, 'created_at', 'last_activity_at')
+    next_cursor = encode_rank_cursor(*hits[-1]) if more else None
+    return json_response({"query": " ".join(terms), "posts": posts, "next": page_link(request, next_cursor)})
+
+def comments_link(request, post_pk, params, **overrides):
+    # Absolute URL into the comments endpoint; None overrides drop the key
+    query = params.copy()
+    for key, value in overrides.items():
+        query.pop(key, None)
+        if value is not None:
+            query[key] = value
+    url = reverse("api-post-comments", args=[post_pk])
+    return request.build_absolute_uri(f"{url}?{query.urlencode()}" if query else url)
 
-def _comment_to_dict(c):
+def comment_page_options(request, post_pk, params):
+    """comment_page() arguments selected by `params` (a QueryDict); raises CursorError on bad input."""
     return {
-        "id": c.id,
-        "user": getattr(c.user, 'email', None),
-        "content": c.content,
-        "created_at": c.created_at,
-        "replies": [
-            _comment_to_dict(rc) for rc in c.replies.filter(deleted_at__isnull=True).order_by('created_at')
-        ],
+        "cursor": params.get("cursor"),
+        "limit": parse_limit(params.get("limit")),
+        "max_depth": parse_limit(params.get("max_depth"), DEFAULT_MAX_DEPTH, MAX_DEPTH, 0, "max_depth"),
+        "replies": parse_limit(params.get("replies"), DEFAULT_REPLIES, MAX_REPLIES, name="replies"),
+        # "Load more replies" pages that comment's children, from after the last one shown
+        "more_link": lambda pk, after: comments_link(request, post_pk, params, parent=pk, cursor=after, limit=None),
     }
 
-def post_detail_api(request, pk):
-    post = get_object_or_404(Post, pk=pk, deleted_at__isnull=True, status='published')
-    root_comments = post.comments.filter(deleted_at__isnull=True, parent__isnull=True).order_by('created_at')
-    comments = [_comment_to_dict(c) for c in root_comments]
-    data = {
+def load_comments(request, post_pk, params, parent_id=None):
+    return comment_page(post_pk, parent_id=parent_id, **comment_page_options(request, post_pk, params))
+
+def post_detail_data(request, post, comments, next_cursor, params):
+    return {
         "id": post.id,
         "title": post.title,
         "content": post.content,
         "author": post.author.email,
         "status": post.status,
-        "created_at": post.created_at,
+        "created_at": format_datetime(post.created_at),
+        "comment_count": post.comment_count,
+        "comments": comments,
+        "comments_next": comments_link(request, post.id, params, cursor=next_cursor) if next_cursor else None,
+    }
+
+def post_comments_data(request, parent_id, comments, next_cursor, prev_cursor):
+    return {
+        "parent": parent_id,
         "comments": comments,
+        "next": page_link(request, next_cursor),
+        "previous": page_link(request, prev_cursor),
     }
-    return JsonResponse(data)
+
+@replica_reads
+@conditional_response(post_detail_validators)
+@cache_response(post_detail_key)
+def post_detail_api(request, pk):
+    post = get_object_or_404(
+        Post.objects.select_related('author'),
+        pk=pk, status='published',
+    )
+    # Only the first page of threads, with default depth; the rest is behind comments_next
+    params = QueryDict(mutable=True)
+    comments, next_cursor, _ = load_comments(request, post.id, params)
+    return json_response(post_detail_data(request, post, comments, next_cursor, params))
+
+@replica_reads
+@conditional_response(post_comments_validators)
+@cache_response(post_comments_key)
+def post_comments_api(request, pk):
+    post = get_object_or_404(Post.objects.only('id'), pk=pk, status='published')
+    parent_id = request.GET.get("parent") or None
+    if parent_id is not None:
+        # isdigit() alone also accepts digits such as "²" that int() rejects
+        if not (parent_id.isascii() and parent_id.isdigit()):
+            return json_error("parent comment not found", 404)
+        parent_id = int(parent_id)
+        if not Comment.objects.filter(pk=parent_id, post=post).exists():
+            return json_error("parent comment not found", 404)
+    try:
+        comments, next_cursor, prev_cursor = load_comments(request, post.id, request.GET, parent_id)
+    except CursorError as exc:
+        return json_error(str(exc), 400)
+    return json_response(post_comments_data(request, parent_id, comments, next_cursor, prev_cursor))
 
 @csrf_exempt
 @require_POST
@@ -66,53 +198,55 @@ def create_post_api(request):
         created_by=request.user.email,
         updated_by=request.user.email,
     )
-    return JsonResponse({"id": post.id, "status": post.status}, status=201)
+    bump_global_version()
+    return json_response({"id": post.id, "status": post.status}, status=201)
 
 @csrf_exempt
 @require_POST
 @login_required
 def update_post_api(request, pk):
-    post = get_post_active(pk)
-    if not getattr(request, "policy", Policy(request.user)).can_change_post(post):
-        return json_error("forbidden", 403)
+    changes = {}
     title = request.POST.get("title")
     content = request.POST.get("content")
     status = request.POST.get("status")
     if title is not None:
-        post.title = title
+        changes["title"] = title
     if content is not None:
-        post.content = content
+        changes["content"] = content
     if status in {"draft", "published", "archived"}:
-        post.status = status
-    post.updated_by = request.user.email
-    post.save()
-    return JsonResponse({"id": post.id, "status": post.status})
+        changes["status"] = status
+    # One UPDATE of the posted columns, scoped to what this user may edit
+    editable = getattr(request, "policy", Policy(request.user)).editable_posts(Post.objects.filter(pk=pk))
+    if not editable.update(**changes, updated_by=request.user.email, updated_at=timezone.now()):
+        return write_refused(pk)
+    bump_global_version()
+    # The row is not read back, so status is only echoed when it was written
+    data = {"id": pk}
+    if "status" in changes:
+        data["status"] = changes["status"]
+    return json_response(data)
 
 @csrf_exempt
 @require_POST
 @login_required
 def delete_post_api(request, pk):
-    post = get_post_active(pk)
-    if not getattr(request, "policy", Policy(request.user)).can_delete_post(post):
-        return json_error("forbidden", 403)
-    post.soft_delete()
-    post.updated_by = request.user.email
-    post.save(update_fields=["updated_by", "deleted_at", "updated_at"])
-    return JsonResponse({"id": post.id, "deleted": True})
+    deletable = getattr(request, "policy", Policy(request.user)).deletable_posts(Post.objects.filter(pk=pk))
+    # Queryset soft delete: stamps updated_by and cascades to the post's comments
+    if not deletable.soft_delete(by=request.user):
+        return write_refused(pk)
+    bump_global_version()
+    return json_response({"id": pk, "deleted": True})
 
 @csrf_exempt
 @require_POST
 @login_required
 def publish_post_api(request, pk):
-    post = get_post_active(pk)
     # Publish restricted: admin or author of the post (simple rule)
-    p = getattr(request, "policy", Policy(request.user))
-    if not (p.is_superuser() or post.author_id == request.user.id):
-        return json_error("forbidden", 403)
-    post.status = "published"
-    post.updated_by = request.user.email
-    post.save(update_fields=["status", "updated_by", "updated_at"])
-    return JsonResponse({"id": post.id, "status": post.status})
+    publishable = getattr(request, "policy", Policy(request.user)).publishable_posts(Post.objects.filter(pk=pk))
+    if not publishable.update(status="published", updated_by=request.user.email, updated_at=timezone.now()):
+        return write_refused(pk)
+    bump_global_version()
+    return json_response({"id": pk, "status": "published"})
 
 @csrf_exempt
 @require_POST
@@ -127,17 +261,42 @@ def add_comment_api(request, pk):
     content = (request.POST.get('content') or '').strip()
     if not content:
         return json_error("content required", 400)
+    parent = None
+    parent_id = (request.POST.get('parent') or '').strip()
+    if parent_id:
+        # isdigit() alone also accepts digits such as "²" that int() rejects
+        if not (parent_id.isascii() and parent_id.isdigit()):
+            return json_error("invalid parent", 400)
+        # Live comments of this post only; path/depth are read for the reply's path
+        parent = Comment.objects.filter(pk=int(parent_id), post=post).only('id', 'post_id', 'path', 'depth').first()
+        if parent is None:
+            return json_error("parent comment not found", 400)
+        if parent.depth >= MAX_COMMENT_DEPTH:
+            return json_error("reply depth limit reached", 400)
 
-    c = Comment.objects.create(
-        post=post,
-        user=request.user,
-        content=content,
-        created_by=request.user.email,
-        updated_by=request.user.email,
-    )
-    return JsonResponse({
+    if buffered_writes():
+        pending = PendingComment.new(post, parent, request.user, content)
+        # Written by the queue's worker; a full queue falls back to the insert below
+        if comment_queue().put(pending):
+            return json_response(pending.as_json(), status=202)
+
+    with transaction.atomic():
+        c = Comment.objects.create(
+            post=post,
+            parent=parent,
+            user=request.user,
+            content=content,
+            created_by=request.user.email,
+            updated_by=request.user.email,
+        )
+        Post.track_comments(post.id, +1, at=c.updated_at)
+    # The list shows comment counts, so every page is stale now
+    bump_global_version()
+    return json_response({
         "id": c.id,
         "post_id": post.id,
+        "parent_id": c.parent_id,
+        "depth": c.depth,
         "user": request.user.email,
         "content": c.content,
         "created_at": c.created_at,
@@ -154,5 +313,26 @@ def session_login_api(request):
     if not user or not user.is_active:
         return json_error("invalid credentials", 401)
     login(request, user)
-    return JsonResponse({"status": "ok", "user": username})
+    return json_response({"status": "ok", "user": username})
 
+def cache_stats_api(request):
+    # Monitoring counters for the response cache (per process)
+    if not getattr(request, "policy", Policy(request.user)).is_superuser():
+        return json_error("forbidden", 403)
+    return json_response(cache_stats())
+
+def export_api(request):
+    # Whole corpus as NDJSON, streamed so memory stays flat (admins only)
+    if not getattr(request, "policy", Policy(request.user)).is_superuser():
+        return json_error("forbidden", 403)
+    include_deleted = request.GET.get("include_deleted") in ("1", "true")
+    response = StreamingHttpResponse(ndjson_chunks(export_records(include_deleted)), content_type=NDJSON)
+    response["Content-Disposition"] = 'attachment; filename="blog-export.ndjson"'
+    return response
+
+def metrics_api(request):
+    # Prometheus scrape target; with BLOG_METRICS_TOKEN set it needs "Authorization: Bearer <token>"
+    token = getattr(settings, "BLOG_METRICS_TOKEN", "")
+    if token and not constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return json_error("forbidden", 403)
+    return HttpResponse(exposition(), content_type=PROMETHEUS)
@@ -0,0 +1,113 @@
+"""
+Database settings from the environment.
+
+BLOG_DB_ENGINE picks the backend (``sqlite`` by default, or ``postgres``);
+everything else has a sensible default, so an empty environment gives the
+usual local SQLite file.
+"""
+import copy
+
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import psycopg  # noqa: F401  (psycopg 3: required for the connection pool)
+except ImportError:
+    psycopg = None
+
+TRUE = ("1", "true", "yes", "on")
+
+# Applied on every new SQLite connection. WAL lets readers run alongside the
+# writer; synchronous=NORMAL is durable under WAL except across power loss;
+# mmap serves reads from the page cache instead of read() calls.
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size={mmap_size}",
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+def _flag(env, name, default):
+    value = env.get(name)
+    return default if value is None else value.strip().lower() in TRUE
+
+
+def _int(env, name, default):
+    value = env.get(name)
+    if value in (None, ""):
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ImproperlyConfigured(f"{name} must be an integer, got {value!r}")
+
+
+def sqlite_config(env, base_dir):
+    mmap_size = _int(env, "BLOG_DB_SQLITE_MMAP_SIZE", 256 * 1024 * 1024)
+    return {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": env.get("BLOG_DB_NAME") or base_dir / "db.sqlite3",
+        "OPTIONS": {
+            "init_command": ";".join(SQLITE_PRAGMAS).format(mmap_size=mmap_size),
+            # Seconds a writer waits on a locked database before "database is locked"
+            "timeout": _int(env, "BLOG_DB_SQLITE_BUSY_TIMEOUT", 5),
+            # Take the write lock at BEGIN so a read->write upgrade can't fail mid-transaction
+            "transaction_mode": "IMMEDIATE",
+        },
+    }
+
+
+def postgres_config(env):
+    config = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": env.get("BLOG_DB_NAME", "blogpage"),
+        "USER": env.get("BLOG_DB_USER", ""),
+        "PASSWORD": env.get("BLOG_DB_PASSWORD", ""),
+        "HOST": env.get("BLOG_DB_HOST", ""),
+        "PORT": env.get("BLOG_DB_PORT", ""),
+        # Keep connections across requests instead of reconnecting each time
+        "CONN_MAX_AGE": _int(env, "BLOG_DB_CONN_MAX_AGE", 60),
+        # ...and check a reused connection is still alive before the request uses it
+        "CONN_HEALTH_CHECKS": _flag(env, "BLOG_DB_CONN_HEALTH_CHECKS", True),
+        "OPTIONS": {},
+    }
+    if _flag(env, "BLOG_DB_POOL", False):
+        if psycopg is None:
+            raise ImproperlyConfigured("BLOG_DB_POOL needs psycopg 3 with psycopg_pool (pip install 'psycopg[pool]').")
+        config["OPTIONS"]["pool"] = {
+            "min_size": _int(env, "BLOG_DB_POOL_MIN_SIZE", 2),
+            "max_size": _int(env, "BLOG_DB_POOL_MAX_SIZE", 10),
+            "timeout": _int(env, "BLOG_DB_POOL_TIMEOUT", 10),
+        }
+        # The pool owns connection reuse; Django rejects persistent connections alongside it
+        config["CONN_MAX_AGE"] = 0
+    return config
+
+
+def database_config(env, base_dir):
+    engine = env.get("BLOG_DB_ENGINE", "sqlite").strip().lower()
+    if engine in ("sqlite", "sqlite3"):
+        return sqlite_config(env, base_dir)
+    if engine in ("postgres", "postgresql"):
+        return postgres_config(env)
+    raise ImproperlyConfigured(f"BLOG_DB_ENGINE must be 'sqlite' or 'postgres', got {engine!r}")
+
+
+def replica_configs(env, primary):
+    """
+    Read replicas from BLOG_DB_REPLICAS (comma separated): database file paths
+    for SQLite, host[:port] entries for Postgres. Each copies the primary's
+    settings and mirrors it under test, so tests run against one database.
+    """
+    replicas = {}
+    entries = [entry.strip() for entry in env.get("BLOG_DB_REPLICAS", "").split(",") if entry.strip()]
+    for number, entry in enumerate(entries, 1):
+        config = copy.deepcopy(primary)
+        if config["ENGINE"].endswith("sqlite3"):
+            config["NAME"] = entry
+        else:
+            host, _, port = entry.partition(":")
+            config["HOST"], config["PORT"] = host, port or config.get("PORT", "")
+        config["TEST"] = {"MIRROR": "default"}
+        replicas[f"replica{number}"] = config
+    return replicas
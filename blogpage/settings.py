@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from .db import database_config, replica_configs
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -33,6 +36,7 @@ ALLOWED_HOSTS = []
 INSTALLED_APPS = [
     'accounts',
     'blog',
+    'bench',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -43,6 +47,8 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    # First, so every query and the whole stack's time are attributed to the request
+    'blog.middleware.RequestInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -51,6 +57,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'accounts.middleware.PolicyMiddleware',
+    'blog.middleware.ReplicaPinningMiddleware',
 ]
 
 ROOT_URLCONF = 'blogpage.urls'
@@ -76,14 +83,107 @@ WSGI_APPLICATION = 'blogpage.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-# Use SQLite for local development to avoid Postgres setup issues.
-# Switch to Postgres via environment-specific settings when required.
+# SQLite (WAL, tuned pragmas) unless BLOG_DB_ENGINE=postgres; see blogpage/db.py
+# for the BLOG_DB_* variables (persistent connections, health checks, pool).
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+    'default': database_config(os.environ, BASE_DIR),
+}
+
+# Optional read replicas (BLOG_DB_REPLICAS). Only views marked with
+# blog.routers.replica_reads read from them; a client that just wrote is
+# pinned to the primary for BLOG_REPLICA_PIN_SECONDS.
+DATABASES.update(replica_configs(os.environ, DATABASES['default']))
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['blog.routers.ReplicaRouter']
+BLOG_REPLICA_PIN_SECONDS = int(os.environ.get('BLOG_REPLICA_PIN_SECONDS', 5))
+
+# Serve the post list/detail/comments endpoints from the native async views in
+# blog.async_views. blogpage/asgi.py turns this on; WSGI keeps the sync views.
+BLOG_ASYNC_VIEWS = os.environ.get('BLOG_ASYNC_VIEWS', '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# Response cache for the read APIs. locmem is per process; the file backend
+# is shared by every worker on the host and needs no external service.
+if os.environ.get('BLOG_CACHE_BACKEND', 'locmem') == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('BLOG_CACHE_DIR', BASE_DIR / '.cache'),
+        }
     }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'blog',
+        }
+    }
+
+# Seconds a rendered post list/detail body stays cached; 0 disables the cache
+BLOG_CACHE_TIMEOUT = int(os.environ.get('BLOG_CACHE_TIMEOUT', 300))
+
+# Request instrumentation (blog.middleware.RequestInstrumentationMiddleware).
+# Server-Timing headers expose timings to clients, so they default to DEBUG only.
+BLOG_SERVER_TIMING = os.environ.get('BLOG_SERVER_TIMING', '1' if DEBUG else '0').lower() in ('1', 'true', 'yes', 'on')
+# Most queries a request to each URL name may run, session and user lookups
+# included. Over budget logs a warning; with enforcement on (tests) it fails.
+BLOG_QUERY_BUDGETS = {
+    'api-post-list': 5,
+    'api-post-search': 6,
+    'api-post-detail': 8,
+    'api-post-comments': 9,
+    'api-add-comment': 12,
+    'api-post-update': 6,
+    'api-post-publish': 6,
 }
+BLOG_QUERY_BUDGET_ENFORCE = os.environ.get('BLOG_QUERY_BUDGET_ENFORCE', '').lower() in ('1', 'true', 'yes', 'on')
+
+# Prometheus metrics at /metrics/ (blog/metrics.py). Pre-fork servers need
+# BLOG_METRICS_DIR, a directory shared by the workers (cleared on deploy),
+# so a scrape sees every process; BLOG_METRICS_TOKEN protects the endpoint.
+BLOG_METRICS = os.environ.get('BLOG_METRICS', '1').lower() in ('1', 'true', 'yes', 'on')
+BLOG_METRICS_DIR = os.environ.get('BLOG_METRICS_DIR') or None
+BLOG_METRICS_FLUSH_SECONDS = float(os.environ.get('BLOG_METRICS_FLUSH_SECONDS', 1))
+BLOG_METRICS_TOKEN = os.environ.get('BLOG_METRICS_TOKEN', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # One line per request at INFO (BLOG_REQUEST_LOG_LEVEL=INFO); over-budget requests at WARNING
+        'blog.requests': {
+            'handlers': ['console'],
+            'level': os.environ.get('BLOG_REQUEST_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+        # Buffered comment writes: recovered spools, dropped or failed batches
+        'blog.comments': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+# API response encoder: 'orjson', 'stdlib' or 'auto' (orjson when installed)
+BLOG_JSON_SERIALIZER = os.environ.get('BLOG_JSON_SERIALIZER', 'auto')
+
+# Comment inserts (blog/comment_queue.py): 'sync' writes each comment in its
+# request (201); 'buffered' queues it in process and a background thread
+# bulk-inserts batches (202 with a provisional id). A full queue falls back
+# to 'sync'. BLOG_COMMENT_SPOOL_DIR keeps queued comments on disk until they
+# are written, so a crashed worker's comments are picked up by the next one.
+BLOG_COMMENT_WRITES = os.environ.get('BLOG_COMMENT_WRITES', 'sync')
+BLOG_COMMENT_BATCH_SIZE = int(os.environ.get('BLOG_COMMENT_BATCH_SIZE', 200))
+BLOG_COMMENT_FLUSH_SECONDS = float(os.environ.get('BLOG_COMMENT_FLUSH_SECONDS', 0.05))
+BLOG_COMMENT_QUEUE_MAX = int(os.environ.get('BLOG_COMMENT_QUEUE_MAX', 5000))
+BLOG_COMMENT_SPOOL_DIR = os.environ.get('BLOG_COMMENT_SPOOL_DIR') or None
 
 
 # Password validation
@@ -0,0 +1,63 @@
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase
+
+from . import db
+from .db import database_config
+
+
+class DatabaseConfigTests(SimpleTestCase):
+
+    def test_sqlite_defaults(self):
+        config = database_config({}, Path("/srv/app"))
+        self.assertEqual(config["ENGINE"], "django.db.backends.sqlite3")
+        self.assertEqual(config["NAME"], Path("/srv/app/db.sqlite3"))
+        self.assertIn("PRAGMA journal_mode=WAL", config["OPTIONS"]["init_command"])
+        self.assertEqual(config["OPTIONS"]["transaction_mode"], "IMMEDIATE")
+
+    def test_sqlite_pragmas_apply_on_connect(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {"BLOG_DB_NAME": f"{tmp}/test.sqlite3", "BLOG_DB_SQLITE_MMAP_SIZE": "1048576"}
+            config = database_config(env, Path(tmp))
+            # Own handler and alias: SimpleTestCase blocks the project's connections
+            connection = ConnectionHandler({"default": config, "pragmas": config})["pragmas"]
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute("PRAGMA journal_mode")
+                    self.assertEqual(cursor.fetchone()[0], "wal")
+                    cursor.execute("PRAGMA synchronous")
+                    self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+                    cursor.execute("PRAGMA mmap_size")
+                    self.assertEqual(cursor.fetchone()[0], 1048576)
+            finally:
+                connection.close()
+
+    def test_postgres_persistent_connections(self):
+        config = database_config({
+            "BLOG_DB_ENGINE": "postgres", "BLOG_DB_NAME": "blog", "BLOG_DB_HOST": "db",
+            "BLOG_DB_CONN_MAX_AGE": "120", "BLOG_DB_CONN_HEALTH_CHECKS": "0",
+        }, Path("."))
+        self.assertEqual(config["ENGINE"], "django.db.backends.postgresql")
+        self.assertEqual((config["NAME"], config["HOST"]), ("blog", "db"))
+        self.assertEqual((config["CONN_MAX_AGE"], config["CONN_HEALTH_CHECKS"]), (120, False))
+        self.assertNotIn("pool", config["OPTIONS"])
+
+    def test_postgres_pool_needs_psycopg3(self):
+        env = {"BLOG_DB_ENGINE": "postgres", "BLOG_DB_POOL": "1", "BLOG_DB_POOL_MAX_SIZE": "20"}
+        with mock.patch.object(db, "psycopg", None):
+            with self.assertRaisesMessage(ImproperlyConfigured, "psycopg 3"):
+                database_config(env, Path("."))
+        with mock.patch.object(db, "psycopg", object()):
+            config = database_config(env, Path("."))
+        self.assertEqual(config["OPTIONS"]["pool"]["max_size"], 20)
+        self.assertEqual(config["CONN_MAX_AGE"], 0)
+
+    def test_rejects_bad_values(self):
+        with self.assertRaises(ImproperlyConfigured):
+            database_config({"BLOG_DB_ENGINE": "oracle"}, Path("."))
+        with self.assertRaises(ImproperlyConfigured):
+            database_config({"BLOG_DB_SQLITE_BUSY_TIMEOUT": "soon"}, Path("."))